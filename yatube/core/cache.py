@@ -0,0 +1,251 @@
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from core import metrics, perf
+
+# Время последнего чтения обновляется не чаще раза в ACCESS_RESOLUTION
+# секунд: иначе каждое попадание превращалось бы в запись на диск.
+ACCESS_RESOLUTION = 1.0
+# Размер кэша проверяется раз в CULL_CHECK записей одного процесса.
+CULL_CHECK = 50
+BUSY_TIMEOUT = 5.0
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_accessed_idx ON cache (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_expires_idx ON cache (expires)',
+)
+ALIVE = '(expires IS NULL OR expires > ?)'
+
+
+def encode(value):
+    # Целые хранятся как INTEGER, чтобы incr был одним UPDATE.
+    if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+        return value
+    return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+
+def decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite, общий для всех процессов одного хоста.
+
+    LOCATION — путь к файлу базы. Записи с истёкшим TTL не отдаются и
+    вычищаются при вытеснении; когда записей больше MAX_ENTRIES,
+    удаляется доля 1 / CULL_FREQUENCY давно не читавшихся (LRU).
+    incr и add атомарны между процессами: на них держатся поколения
+    лент и блокировки single_flight.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        # Соединение своё у каждого потока и не переживает fork.
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path,
+                timeout=BUSY_TIMEOUT,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE сразу берёт блокировку на запись, так что
+        # чтение и запись внутри не перемежаются с другими процессами.
+        connection = self._connection()
+        started = time.perf_counter()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        perf.add('cache_ms', (time.perf_counter() - started) * 1000)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        names = {self._key(key, version): key for key in keys}
+        started = time.perf_counter()
+        now = time.time()
+        connection = self._connection()
+        rows = connection.execute(
+            f'SELECT key, value, accessed FROM cache '
+            f'WHERE key IN ({",".join("?" * len(names))}) AND {ALIVE}',
+            [*names, now],
+        ).fetchall()
+        stale = [
+            (now, name) for name, _, accessed in rows
+            if now - accessed >= ACCESS_RESOLUTION
+        ]
+        if stale:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?', stale
+            )
+        perf.cache_read(
+            len(rows), len(names) - len(rows), time.perf_counter() - started
+        )
+        metrics.inc('yatube_cache_hits_total', value=len(rows))
+        metrics.inc('yatube_cache_misses_total', value=len(names) - len(rows))
+        return {names[name]: decode(value) for name, value, _ in rows}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout=timeout, version=version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        rows = [
+            (self._key(key, version), encode(value), expires, now)
+            for key, value in data.items()
+        ]
+        with self._transaction() as connection:
+            connection.executemany(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?)',
+                rows,
+            )
+        self._written(len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                'INSERT INTO cache (key, value, expires, accessed) '
+                'VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, '
+                'expires = excluded.expires, accessed = excluded.accessed '
+                'WHERE cache.expires IS NOT NULL AND cache.expires <= ?',
+                (
+                    self._key(key, version),
+                    encode(value),
+                    self.get_backend_timeout(timeout),
+                    now,
+                    now,
+                ),
+            )
+        added = cursor.rowcount == 1
+        if added:
+            self._written(1)
+        return added
+
+    def incr(self, key, delta=1, version=None):
+        name = self._key(key, version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                f"SELECT value, typeof(value) = 'integer' FROM cache "
+                f'WHERE key = ? AND {ALIVE}',
+                (name, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            if not row[1]:
+                raise ValueError(f"Key '{key}' is not an integer")
+            value = row[0] + delta
+            connection.execute(
+                'UPDATE cache SET value = ? WHERE key = ?', (value, name)
+            )
+        return value
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                f'UPDATE cache SET expires = ? WHERE key = ? AND {ALIVE}',
+                (
+                    self.get_backend_timeout(timeout),
+                    self._key(key, version),
+                    time.time(),
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        return self._connection().execute(
+            f'SELECT 1 FROM cache WHERE key = ? AND {ALIVE}',
+            (self._key(key, version), time.time()),
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        names = [(self._key(key, version),) for key in keys]
+        with self._transaction() as connection:
+            connection.executemany('DELETE FROM cache WHERE key = ?', names)
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def _written(self, count):
+        self._writes += count
+        if self._writes >= CULL_CHECK:
+            self._writes = 0
+            self._cull()
+
+    def _cull(self):
+        with self._transaction() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+            )
+            (total,) = connection.execute(
+                'SELECT COUNT(*) FROM cache'
+            ).fetchone()
+            if total <= self._max_entries:
+                return
+            if not self._cull_frequency:
+                connection.execute('DELETE FROM cache')
+                return
+            excess = total - self._max_entries
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (excess + self._max_entries // self._cull_frequency,),
+            )
+
+    def close(self, **kwargs):
+        # Соединение держится на поток до конца его жизни: открывать
+        # файл и проверять схему на каждый запрос слишком дорого.
+        pass
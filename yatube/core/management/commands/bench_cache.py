@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+OPERATIONS = ('set', 'get', 'incr')
+
+
+def make_backend(name, path):
+    params = {'OPTIONS': {'MAX_ENTRIES': 1_000_000}}
+    if name == 'locmem':
+        return LocMemCache('bench', params)
+    return SQLiteCache(path, params)
+
+
+def run(backend, operation, ops, keys, worker, results):
+    """Выполняет ops операций в отдельном процессе и сообщает итог."""
+    hits = 0
+    started = time.perf_counter()
+    for index in range(ops):
+        key = f'bench:{(index * 7 + worker) % keys}'
+        if operation == 'set':
+            backend.set(key, index)
+        elif operation == 'get':
+            hits += backend.get(key) is not None
+        else:
+            try:
+                backend.incr('bench:counter')
+            except ValueError:
+                backend.add('bench:counter', 0, None)
+                backend.incr('bench:counter')
+    results.put((time.perf_counter() - started, hits))
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLiteCache и LocMemCache '
+        'при нескольких процессах и долю чтений, которые видят записи '
+        'других процессов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--ops', type=int, default=5000,
+            help='Операций на процесс.'
+        )
+        parser.add_argument('--keys', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        context = multiprocessing.get_context('fork')
+        self.stdout.write(
+            f'{"backend":<8}{"op":<6}{"ops/s":>12}{"hit %":>8}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            for name in ('locmem', 'sqlite'):
+                backend = make_backend(name, path)
+                for operation in OPERATIONS:
+                    rate, hits = self.measure(
+                        context, backend, operation, options
+                    )
+                    hits = f'{hits:.1f}' if operation == 'get' else '-'
+                    self.stdout.write(
+                        f'{name:<8}{operation:<6}{rate:>12.0f}{hits:>8}'
+                    )
+                if name == 'sqlite':
+                    value = backend.get('bench:counter')
+                    expected = options['workers'] * options['ops']
+                    self.stdout.write(
+                        f'incr: {value} из {expected} '
+                        f'({"атомарно" if value == expected else "потери"})'
+                    )
+
+    def measure(self, context, backend, operation, options):
+        """Операций в секунду на все процессы и процент попаданий.
+
+        Ключи для get записывает предыдущий прогон set в других
+        процессах: у LocMemCache они остаются невидимыми.
+        """
+        results = context.Queue()
+        workers = [
+            context.Process(target=run, args=(
+                backend, operation, options['ops'], options['keys'],
+                worker, results,
+            ))
+            for worker in range(options['workers'])
+        ]
+        for process in workers:
+            process.start()
+        outcomes = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        elapsed = max(seconds for seconds, _ in outcomes)
+        total = options['ops'] * len(workers)
+        hits = sum(hits for _, hits in outcomes)
+        return total / elapsed, 100 * hits / total
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт подписанный заголовок, с которым запрос к сайту '
+        'профилируется в cProfile (см. ProfilingMiddleware).'
+    )
+
+    def handle(self, *args, **options):
+        minutes = profiling.token_max_age() // 60
+        self.stdout.write(f'{profiling.HEADER}: {profiling.make_token()}')
+        self.stderr.write(f'Заголовок действителен {minutes} мин.')
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+from core.models import SlowQuery
+
+ORDERS = {
+    'total': '-total_ms',
+    'count': '-count',
+    'max': '-max_ms',
+    'recent': '-last_seen',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Отчёт журнала медленных запросов: отпечатки SQL по убыванию '
+        'суммарного времени, с представлением, планом и местом вызова.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument(
+            '--order', choices=sorted(ORDERS), default='total'
+        )
+        parser.add_argument('--view', help='Только для представления.')
+        parser.add_argument(
+            '--details', action='store_true',
+            help='Показать пример, план и место вызова.'
+        )
+        parser.add_argument(
+            '--clear', action='store_true', help='Очистить журнал.'
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, _ = SlowQuery.objects.all().delete()
+            self.stdout.write(f'Удалено записей: {deleted}.')
+            return
+        queries = SlowQuery.objects.annotate(
+            avg_ms=F('total_ms') / Cast('count', FloatField())
+        ).order_by(ORDERS[options['order']])
+        if options['view']:
+            queries = queries.filter(view=options['view'])
+        queries = list(queries[:options['limit']])
+        if not queries:
+            self.stdout.write('Медленных запросов нет.')
+            return
+        self.stdout.write(
+            f'{"count":>7}{"total ms":>11}{"avg ms":>9}{"max ms":>9}  '
+            f'{"view":<24}sql'
+        )
+        for query in queries:
+            self.stdout.write(
+                f'{query.count:>7}{query.total_ms:>11.1f}'
+                f'{query.avg_ms:>9.1f}{query.max_ms:>9.1f}  '
+                f'{query.view:<24}{query.sql[:100]}'
+            )
+            if options['details']:
+                self.write_details(query)
+
+    def write_details(self, query):
+        self.stdout.write(f'  отпечаток: {query.fingerprint}')
+        for title, text in (
+            ('пример', query.example),
+            ('план', query.plan),
+            ('место вызова', query.stack),
+        ):
+            if text:
+                self.stdout.write(f'  {title}:')
+                for line in text.rstrip().splitlines():
+                    self.stdout.write(f'    {line}')
+        self.stdout.write('')
@@ -0,0 +1,197 @@
+import gc
+import itertools
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+
+from django.conf import settings
+
+# Пакеты, которые в отчёте делятся по второму уровню: django.db,
+# django.template и так далее; остальные — по первому.
+SPLIT_PACKAGES = {'django', 'sorl'}
+IGNORE = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+)
+
+_lock = threading.Lock()
+_snapshots = OrderedDict()
+_ids = itertools.count(1)
+
+
+def frames():
+    """Глубина стека, запоминаемая для каждого выделения памяти."""
+    return getattr(settings, 'CORE_MEMORY_FRAMES', 1)
+
+
+def keep():
+    """Сколько последних снимков держать в памяти процесса."""
+    return getattr(settings, 'CORE_MEMORY_SNAPSHOTS', 5)
+
+
+def rss():
+    """Резидентная память процесса, байт."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        # Нет /proc: берём пик, на Linux он в килобайтах.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def start():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames())
+
+
+def stop():
+    """Выключает трассировку и забывает снимки."""
+    tracemalloc.stop()
+    clear()
+
+
+def clear():
+    with _lock:
+        _snapshots.clear()
+
+
+def take(pin=False):
+    """Снимает память процесса и возвращает номер снимка.
+
+    Трассировка включается, если ещё не была: тогда в первом снимке
+    видно только выделенное с этого момента. Закреплённый (pin) снимок
+    не вытесняется и не входит в keep(): это база долгого замера.
+    """
+    start()
+    gc.collect()
+    snapshot = tracemalloc.take_snapshot().filter_traces(IGNORE)
+    with _lock:
+        number = next(_ids)
+        _snapshots[number] = {
+            'snapshot': snapshot,
+            'taken': time.time(),
+            'rss': rss(),
+            'pinned': pin,
+        }
+        unpinned = [
+            key for key, entry in _snapshots.items() if not entry['pinned']
+        ]
+        for key in unpinned[:max(len(unpinned) - keep(), 0)]:
+            del _snapshots[key]
+    return number
+
+
+def snapshots():
+    with _lock:
+        return [
+            {'id': number, 'taken': entry['taken'], 'rss': entry['rss']}
+            for number, entry in _snapshots.items()
+        ]
+
+
+def get(number):
+    with _lock:
+        return _snapshots.get(number)
+
+
+def _snapshot(number):
+    entry = get(number)
+    if entry is None:
+        raise LookupError(
+            f'Снимка {number} нет: он вытеснен (хранятся последние '
+            f'{keep()}) или не снимался.'
+        )
+    return entry['snapshot']
+
+
+def module_of(filename):
+    """Модуль файла с учётом sys.path: '.../django/db/models/query.py'
+    -> 'django.db', '.../posts/views.py' -> 'posts'."""
+    best = ''
+    for entry in sys.path:
+        entry = os.path.abspath(entry or os.curdir) + os.sep
+        if filename.startswith(entry) and len(entry) > len(best):
+            best = entry
+    if not best:
+        return filename
+    parts = filename[len(best):].split(os.sep)
+    parts[-1] = os.path.splitext(parts[-1])[0]
+    depth = 2 if parts[0] in SPLIT_PACKAGES and len(parts) > 2 else 1
+    return '.'.join(parts[:depth])
+
+
+def _grouped(stats):
+    groups = {}
+    for stat in stats:
+        module = module_of(stat.traceback[0].filename)
+        size, count = groups.get(module, (0, 0))
+        groups[module] = (size + stat.size, count + stat.count)
+    return groups
+
+
+def report(number, base=None, limit=20):
+    """Места выделения памяти снимка number по модулям и строкам.
+
+    С base размеры даются приростом от снимка base: так видно,
+    что копится между двумя моментами работы процесса.
+    """
+    snapshot = _snapshot(number)
+    lines = snapshot.statistics('lineno')
+    groups = _grouped(lines)
+    if base is None:
+        sites = lines
+        before = {}
+    else:
+        previous = _snapshot(base)
+        sites = snapshot.compare_to(previous, 'lineno')
+        before = _grouped(previous.statistics('lineno'))
+    modules = [
+        {
+            'module': module,
+            'size': size,
+            'count': count,
+            'size_diff': size - before.get(module, (0, 0))[0],
+            'count_diff': count - before.get(module, (0, 0))[1],
+        }
+        for module, (size, count) in groups.items()
+    ]
+    key = 'size_diff' if base is not None else 'size'
+    modules.sort(key=lambda entry: -abs(entry[key]))
+    return {
+        'snapshot': number,
+        'base': base,
+        'modules': modules[:limit],
+        'sites': [
+            {
+                'site': f'{frame.filename}:{frame.lineno}',
+                'module': module_of(frame.filename),
+                'size': stat.size,
+                'count': stat.count,
+                'size_diff': getattr(stat, 'size_diff', stat.size),
+            }
+            for stat in sites[:limit]
+            for frame in [stat.traceback[0]]
+        ],
+    }
+
+
+def status():
+    current, peak = (
+        tracemalloc.get_traced_memory() if tracemalloc.is_tracing()
+        else (0, 0)
+    )
+    return {
+        'pid': os.getpid(),
+        'rss': rss(),
+        'tracing': tracemalloc.is_tracing(),
+        'traced': current,
+        'traced_peak': peak,
+        'snapshots': snapshots(),
+    }
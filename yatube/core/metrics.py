@@ -0,0 +1,226 @@
+import atexit
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+
+# Метрики: имя -> (тип, описание). Имена гистограмм — без суффиксов.
+METRICS = {
+    'yatube_http_requests_total': (
+        'counter', 'Запросы по представлению, методу и коду ответа.'
+    ),
+    'yatube_http_request_duration_seconds': (
+        'histogram', 'Время ответа по представлению.'
+    ),
+    'yatube_db_queries_total': (
+        'counter', 'SQL-запросы по представлению.'
+    ),
+    'yatube_db_query_duration_seconds_total': (
+        'counter', 'Время SQL-запросов по представлению.'
+    ),
+    'yatube_cache_hits_total': ('counter', 'Попадания в кэш.'),
+    'yatube_cache_misses_total': ('counter', 'Промахи кэша.'),
+    'yatube_single_flight_total': (
+        'counter', 'Исходы кэша лент: hits, stale, recomputes, waits.'
+    ),
+    'yatube_thumbnails_total': (
+        'counter', 'Обработанные картинки по исходу: created, skipped, error.'
+    ),
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Границы корзин гистограммы времени ответа, секунд.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS metrics ('
+    ' name TEXT NOT NULL,'
+    ' labels TEXT NOT NULL,'
+    ' value REAL NOT NULL,'
+    ' PRIMARY KEY (name, labels)'
+    ') WITHOUT ROWID'
+)
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+LE = re.compile(r',?le="([^"]*)"')
+
+_lock = threading.Lock()
+_pending = {}
+_state = {'pid': os.getpid(), 'flushed': time.monotonic()}
+_local = threading.local()
+
+
+def path():
+    """Файл, в котором складываются метрики всех процессов хоста."""
+    return getattr(
+        settings, 'CORE_METRICS_PATH',
+        os.path.join(settings.BASE_DIR, 'metrics.sqlite3'),
+    )
+
+
+def flush_interval():
+    """Как часто процесс сбрасывает накопленное в общий файл, секунд."""
+    return getattr(settings, 'CORE_METRICS_FLUSH_INTERVAL', 1.0)
+
+
+def token():
+    """Токен для /metrics; None — доступ без токена."""
+    return getattr(settings, 'CORE_METRICS_TOKEN', None)
+
+
+def escape(value):
+    return (
+        str(value).replace('\\', '\\\\').replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def format_labels(labels):
+    return ','.join(f'{key}="{escape(value)}"' for key, value in labels)
+
+
+def inc(name, labels=(), value=1):
+    """Прибавляет value к счётчику name с метками labels."""
+    key = (name, format_labels(labels))
+    with _lock:
+        if _state['pid'] != os.getpid():
+            # Дочерний процесс после fork не досылает родительское.
+            _pending.clear()
+            _state['pid'] = os.getpid()
+        _pending[key] = _pending.get(key, 0) + value
+
+
+def observe(name, labels, value):
+    """Добавляет наблюдение value в гистограмму name."""
+    for bound in BUCKETS:
+        if value <= bound:
+            inc(f'{name}_bucket', (*labels, ('le', bound)))
+    inc(f'{name}_bucket', (*labels, ('le', '+Inf')))
+    inc(f'{name}_sum', labels, value)
+    inc(f'{name}_count', labels)
+
+
+def request(view, method, status, values):
+    """Метрики одного HTTP-запроса по показателям core.perf."""
+    if method not in METHODS:
+        # Произвольные методы не должны плодить ряды метрик.
+        method = 'other'
+    labels = (('view', view),)
+    inc(
+        'yatube_http_requests_total',
+        (*labels, ('method', method), ('status', status)),
+    )
+    observe(
+        'yatube_http_request_duration_seconds', labels,
+        values['total_ms'] / 1000,
+    )
+    inc('yatube_db_queries_total', labels, values['queries'])
+    inc(
+        'yatube_db_query_duration_seconds_total', labels,
+        values['db_ms'] / 1000,
+    )
+
+
+def _connection():
+    # Соединение своё у каждого потока и процесса: после fork
+    # унаследованное от родителя использовать нельзя.
+    location = path()
+    if getattr(_local, 'key', None) != (os.getpid(), location):
+        connection = sqlite3.connect(
+            location, timeout=5.0, isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(SCHEMA)
+        _local.connection = connection
+        _local.key = (os.getpid(), location)
+    return _local.connection
+
+
+def flush(force=False):
+    """Досылает накопленные приращения в общий файл метрик.
+
+    Без force пишет не чаще flush_interval(): запись — одна
+    транзакция на все метрики, сколько бы запросов их ни набрали.
+    """
+    with _lock:
+        if not _pending or _state['pid'] != os.getpid():
+            return
+        now = time.monotonic()
+        if not force and now - _state['flushed'] < flush_interval():
+            return
+        rows = [(name, labels, value) for (name, labels), value
+                in _pending.items()]
+        _pending.clear()
+        _state['flushed'] = now
+    connection = _connection()
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.executemany(
+            'INSERT INTO metrics (name, labels, value) VALUES (?, ?, ?) '
+            'ON CONFLICT (name, labels) '
+            'DO UPDATE SET value = value + excluded.value',
+            rows,
+        )
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def value(name, labels=()):
+    """Текущее значение счётчика по всем процессам хоста."""
+    flush(force=True)
+    row = _connection().execute(
+        'SELECT value FROM metrics WHERE name = ? AND labels = ?',
+        (name, format_labels(labels)),
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def _family(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def _order(row):
+    # Корзины гистограммы идут по возрастанию le, +Inf последней.
+    name, labels, _ = row
+    match = LE.search(labels)
+    bound = float(match.group(1)) if match else 0.0
+    return _family(name), LE.sub('', labels), name, bound
+
+
+def render():
+    """Все метрики хоста в текстовом формате Prometheus."""
+    flush(force=True)
+    rows = _connection().execute(
+        'SELECT name, labels, value FROM metrics'
+    ).fetchall()
+    lines = []
+    family = None
+    for name, labels, value in sorted(rows, key=_order):
+        if _family(name) != family:
+            family = _family(name)
+            if family in METRICS:
+                kind, description = METRICS[family]
+                lines.append(f'# HELP {family} {description}')
+                lines.append(f'# TYPE {family} {kind}')
+        value = int(value) if value == int(value) else value
+        lines.append(
+            f'{name}{{{labels}}} {value}' if labels else f'{name} {value}'
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    """Стирает все метрики хоста: для тестов."""
+    with _lock:
+        _pending.clear()
+    _connection().execute('DELETE FROM metrics')
+
+
+atexit.register(flush, force=True)
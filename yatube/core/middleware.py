@@ -0,0 +1,78 @@
+import logging
+import time
+
+from core import metrics, perf, profiling, slowlog
+
+logger = logging.getLogger(__name__)
+
+
+class PerformanceMiddleware:
+    """Замеряет каждый запрос: SQL, кэш, шаблоны и общее время.
+
+    Показатели копятся в perf.stats по имени представления и уходят
+    клиенту в заголовке Server-Timing, а запросы к базе дольше
+    CORE_SLOW_QUERY_MS пишутся в журнал медленных запросов
+    (core.slowlog). Счётчики для Prometheus копятся в core.metrics
+    и раз в CORE_METRICS_FLUSH_INTERVAL сбрасываются в общий файл
+    хоста. Стоит первым в MIDDLEWARE, чтобы общее время
+    включало остальные middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = perf.Recorder()
+        with perf.record(recorder):
+            response = self.get_response(request)
+        values = recorder.finish()
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        perf.stats.add(view, values, error=response.status_code >= 500)
+        metrics.request(view, request.method, response.status_code, values)
+        metrics.flush()
+        if recorder.slow:
+            slowlog.save(view, recorder.slow)
+        if perf.server_timing_enabled():
+            response['Server-Timing'] = perf.server_timing(values)
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запрос в cProfile по требованию или выборочно.
+
+    Профиль снимается по подписанному заголовку X-Profile (значение
+    выдаёт manage.py profile_token), по флагу ?profile у персонала
+    или для доли CORE_PROFILE_SAMPLE_RATE всех запросов. Файлы .prof
+    со сводкой .txt пишутся в CORE_PROFILE_DIR, где хранятся
+    CORE_PROFILE_KEEP последних. Тем, кто просил профиль, имя файла
+    приходит в заголовке X-Profile. Стоит после
+    AuthenticationMiddleware: флагу нужен request.user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        reason = profiling.requested(request)
+        profiler = profiling.start() if reason else None
+        if profiler is None:
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        try:
+            name = profiling.save(
+                profiler, request, view, response.status_code, elapsed_ms
+            )
+        except OSError:
+            logger.exception('Не удалось сохранить профиль %s', view)
+            return response
+        if reason != 'sample':
+            response[profiling.HEADER] = name
+        return response
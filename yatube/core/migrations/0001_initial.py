@@ -0,0 +1,35 @@
+# Generated by Django 2.2.16 on 2026-10-18 15:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=40, unique=True, verbose_name='Отпечаток SQL')),
+                ('sql', models.TextField(verbose_name='SQL без литералов')),
+                ('example', models.TextField(blank=True, verbose_name='Пример SQL')),
+                ('view', models.CharField(blank=True, max_length=200, verbose_name='Представление')),
+                ('plan', models.TextField(blank=True, verbose_name='План запроса')),
+                ('stack', models.TextField(blank=True, verbose_name='Место вызова')),
+                ('count', models.PositiveIntegerField(default=1, verbose_name='Число запросов')),
+                ('total_ms', models.FloatField(verbose_name='Суммарное время, мс')),
+                ('max_ms', models.FloatField(verbose_name='Наибольшее время, мс')),
+                ('first_seen', models.DateTimeField(auto_now_add=True, verbose_name='Впервые')),
+                ('last_seen', models.DateTimeField(auto_now_add=True, verbose_name='Последний раз')),
+            ],
+            options={
+                'verbose_name': 'медленный запрос',
+                'verbose_name_plural': 'медленные запросы',
+            },
+        ),
+    ]
@@ -11,3 +11,31 @@ class CreatedModel(models.Model):
     class Meta:
         # Это абстрактная модель:
         abstract = True
+
+
+class SlowQuery(models.Model):
+    """Запросы к базе дольше CORE_SLOW_QUERY_MS, сгруппированные
+    по отпечатку SQL. Пример, план и место вызова — от самого
+    медленного запроса с этим отпечатком."""
+    fingerprint = models.CharField(
+        'Отпечаток SQL',
+        max_length=40,
+        unique=True
+    )
+    sql = models.TextField('SQL без литералов')
+    example = models.TextField('Пример SQL', blank=True)
+    view = models.CharField('Представление', max_length=200, blank=True)
+    plan = models.TextField('План запроса', blank=True)
+    stack = models.TextField('Место вызова', blank=True)
+    count = models.PositiveIntegerField('Число запросов', default=1)
+    total_ms = models.FloatField('Суммарное время, мс')
+    max_ms = models.FloatField('Наибольшее время, мс')
+    first_seen = models.DateTimeField('Впервые', auto_now_add=True)
+    last_seen = models.DateTimeField('Последний раз', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'медленный запрос'
+        verbose_name_plural = 'медленные запросы'
+
+    def __str__(self):
+        return self.sql[:50]
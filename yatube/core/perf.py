@@ -0,0 +1,221 @@
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from core import slowlog
+
+# Верхние границы корзин гистограммы времени ответа, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Суммируемые показатели запроса.
+FIELDS = (
+    'total_ms', 'db_ms', 'queries', 'cache_ms', 'cache_hits',
+    'cache_misses', 'template_ms',
+)
+# Отрезок окна статистики, секунд.
+SLOT = 60
+
+_local = threading.local()
+STARTED = time.time()
+
+
+def window():
+    """За сколько последних минут хранится статистика процесса."""
+    return getattr(settings, 'CORE_PERF_WINDOW', 15)
+
+
+def server_timing_enabled():
+    return getattr(settings, 'CORE_PERF_SERVER_TIMING', True)
+
+
+class Recorder:
+    """Показатели одного запроса. Заполняется хуками ниже."""
+
+    def __init__(self):
+        self.values = dict.fromkeys(FIELDS, 0)
+        self.template_depth = 0
+        self.slow = []
+        self.slow_ms = slowlog.threshold()
+        self.started = time.perf_counter()
+
+    def add(self, field, value):
+        self.values[field] += value
+
+    def sql(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self.values['db_ms'] += elapsed
+            self.values['queries'] += 1
+            if (
+                self.slow_ms is not None and elapsed >= self.slow_ms
+                and not many
+            ):
+                self.slow.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': params,
+                    'ms': elapsed,
+                    'stack': slowlog.call_site(),
+                })
+
+    def finish(self):
+        self.values['total_ms'] = (time.perf_counter() - self.started) * 1000
+        return self.values
+
+
+def current():
+    """Recorder текущего запроса или None вне запроса."""
+    return getattr(_local, 'recorder', None)
+
+
+def add(field, value):
+    recorder = current()
+    if recorder is not None:
+        recorder.add(field, value)
+
+
+def cache_read(hits, misses, seconds):
+    recorder = current()
+    if recorder is not None:
+        recorder.add('cache_hits', hits)
+        recorder.add('cache_misses', misses)
+        recorder.add('cache_ms', seconds * 1000)
+
+
+def record(recorder):
+    """Ставит recorder текущим и подключает его к базам данных.
+
+    Возвращает ExitStack, закрытие которого всё отключает.
+    """
+    stack = ExitStack()
+    _local.recorder = recorder
+    stack.callback(_local.__dict__.pop, 'recorder', None)
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder.sql))
+    return stack
+
+
+class Stats:
+    """Скользящая статистика процесса по представлениям.
+
+    Окно разбито на минутные отрезки: в каждом по имени
+    представления лежат число запросов, суммы показателей FIELDS
+    и гистограмма общего времени по BUCKETS. Отрезки старше
+    window() минут отбрасываются при записи.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {}
+
+    def _new_entry(self):
+        return {
+            'count': 0,
+            'errors': 0,
+            **dict.fromkeys(FIELDS, 0),
+            'buckets': [0] * (len(BUCKETS) + 1),
+        }
+
+    def add(self, view, values, error=False, now=None):
+        slot = int((now or time.time()) // SLOT)
+        with self.lock:
+            views = self.slots.get(slot)
+            if views is None:
+                views = self.slots[slot] = defaultdict(self._new_entry)
+                oldest = slot - window()
+                for stale in [key for key in self.slots if key <= oldest]:
+                    del self.slots[stale]
+            entry = views[view]
+            entry['count'] += 1
+            entry['errors'] += error
+            for field in FIELDS:
+                entry[field] += values[field]
+            entry['buckets'][
+                bisect.bisect_left(BUCKETS, values['total_ms'])
+            ] += 1
+
+    def merged(self, now=None):
+        """Сумма отрезков окна по представлениям."""
+        oldest = int((now or time.time()) // SLOT) - window()
+        result = defaultdict(self._new_entry)
+        with self.lock:
+            for slot, views in self.slots.items():
+                if slot <= oldest:
+                    continue
+                for view, entry in views.items():
+                    total = result[view]
+                    for field in ('count', 'errors', *FIELDS):
+                        total[field] += entry[field]
+                    total['buckets'] = [
+                        a + b for a, b in zip(total['buckets'],
+                                              entry['buckets'])
+                    ]
+        return dict(result)
+
+    def clear(self):
+        with self.lock:
+            self.slots.clear()
+
+
+def quantile(buckets, share):
+    """Верхняя граница корзины, в которую попадает квантиль share."""
+    total = sum(buckets)
+    if not total:
+        return None
+    running = 0
+    for index, count in enumerate(buckets):
+        running += count
+        if running >= share * total:
+            return BUCKETS[index] if index < len(BUCKETS) else None
+    return None
+
+
+def summary(now=None):
+    """Статистика окна в виде, пригодном для JSON."""
+    views = {}
+    for view, entry in sorted(stats.merged(now).items()):
+        count = entry['count']
+        views[view] = {
+            'count': count,
+            'errors': entry['errors'],
+            **{
+                f'avg_{field}': round(entry[field] / count, 2)
+                for field in FIELDS
+            },
+            'p50_ms': quantile(entry['buckets'], 0.5),
+            'p95_ms': quantile(entry['buckets'], 0.95),
+            'p99_ms': quantile(entry['buckets'], 0.99),
+            'histogram': dict(zip(
+                [*(str(bound) for bound in BUCKETS), 'inf'],
+                entry['buckets'],
+            )),
+        }
+    return {
+        'pid': os.getpid(),
+        'uptime_s': round(time.time() - STARTED),
+        'window_min': window(),
+        'views': views,
+    }
+
+
+def server_timing(values):
+    """Значение заголовка Server-Timing по показателям запроса."""
+    return ', '.join([
+        f'db;dur={values["db_ms"]:.1f};desc="{values["queries"]} queries"',
+        f'cache;dur={values["cache_ms"]:.1f};'
+        f'desc="{values["cache_hits"]} hits, '
+        f'{values["cache_misses"]} misses"',
+        f'tpl;dur={values["template_ms"]:.1f}',
+        f'total;dur={values["total_ms"]:.1f}',
+    ])
+
+
+stats = Stats()
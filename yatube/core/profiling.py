@@ -0,0 +1,124 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+
+HEADER = 'X-Profile'
+QUERY_FLAG = 'profile'
+SALT = 'core.profiling'
+UNSAFE = re.compile(r'[^\w.-]+')
+
+
+def directory():
+    """Куда складываются профили; старые вытесняются новыми."""
+    return getattr(
+        settings, 'CORE_PROFILE_DIR',
+        os.path.join(settings.BASE_DIR, 'profiles'),
+    )
+
+
+def sample_rate():
+    """Доля запросов, профилируемых без всякого запроса на то."""
+    return getattr(settings, 'CORE_PROFILE_SAMPLE_RATE', 0.0)
+
+
+def keep():
+    """Сколько последних профилей хранить."""
+    return getattr(settings, 'CORE_PROFILE_KEEP', 200)
+
+
+def top():
+    """Сколько функций попадает в текстовую сводку."""
+    return getattr(settings, 'CORE_PROFILE_TOP', 40)
+
+
+def token_max_age():
+    """Сколько секунд действителен подписанный заголовок."""
+    return getattr(settings, 'CORE_PROFILE_TOKEN_MAX_AGE', 60 * 60)
+
+
+def make_token():
+    """Значение заголовка X-Profile, подписанное SECRET_KEY."""
+    return signing.TimestampSigner(salt=SALT).sign('profile')
+
+
+def valid_token(value):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(
+            value, max_age=token_max_age()
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def requested(request):
+    """Причина профилировать запрос: 'header', 'staff', 'sample'
+    или None, если профилировать не нужно."""
+    if valid_token(request.META.get('HTTP_X_PROFILE', '')):
+        return 'header'
+    user = getattr(request, 'user', None)
+    if QUERY_FLAG in request.GET and user is not None and user.is_staff:
+        return 'staff'
+    rate = sample_rate()
+    if rate and random.random() < rate:
+        return 'sample'
+    return None
+
+
+def start():
+    """Включает профилировщик; None, если поток уже профилируется."""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def save(profiler, request, view, status, elapsed_ms):
+    """Пишет .prof и текстовую сводку по накопленному времени.
+
+    Возвращает имя файла профиля без каталога. Файлы называются
+    по времени, поэтому вытесняются самые старые.
+    """
+    path = directory()
+    os.makedirs(path, exist_ok=True)
+    name = '{}-{:06d}-{}-{}'.format(
+        time.strftime('%Y%m%d-%H%M%S'), int(time.time() % 1 * 10 ** 6),
+        UNSAFE.sub('_', view), os.getpid(),
+    )
+    profiler.dump_stats(os.path.join(path, f'{name}.prof'))
+    summary = io.StringIO()
+    summary.write(
+        f'{request.method} {request.get_full_path()}\n'
+        f'{view}: {status}, {elapsed_ms:.1f} мс\n\n'
+    )
+    pstats.Stats(profiler, stream=summary).sort_stats(
+        'cumulative'
+    ).print_stats(top())
+    with open(os.path.join(path, f'{name}.txt'), 'w') as file:
+        file.write(summary.getvalue())
+    rotate(path)
+    return f'{name}.prof'
+
+
+def rotate(path):
+    """Оставляет keep() последних профилей в каталоге path."""
+    names = sorted(
+        name[:-len('.prof')] for name in os.listdir(path)
+        if name.endswith('.prof')
+    )
+    for name in names[:max(len(names) - keep(), 0)]:
+        for suffix in ('.prof', '.txt'):
+            try:
+                os.remove(os.path.join(path, name + suffix))
+            except FileNotFoundError:
+                # Тот же файл удалил соседний процесс.
+                pass
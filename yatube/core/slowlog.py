@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import os
+import re
+import traceback
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connections, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Сколько кадров стека своего кода сохранять для места вызова.
+STACK_DEPTH = 8
+NORMALIZE = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'%s|\?'), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    # IN (?, ?, ?) с любым числом значений — один отпечаток.
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+_own_files = (__file__, os.path.join(os.path.dirname(__file__), 'perf.py'))
+
+
+def threshold():
+    """Порог медленного запроса в мс; None отключает журнал."""
+    return getattr(settings, 'CORE_SLOW_QUERY_MS', 100)
+
+
+def normalize(sql):
+    """SQL без литералов и параметров: одинаков для всех вызовов."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql):
+    return hashlib.sha1(normalize(sql).encode()).hexdigest()
+
+
+def call_site():
+    """Последние кадры стека из кода проекта, без site-packages."""
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(str(settings.BASE_DIR))
+        and 'site-packages' not in frame.filename
+        and frame.filename not in _own_files
+    ]
+    return ''.join(traceback.format_list(frames[-STACK_DEPTH:]))
+
+
+def explain(alias, sql, params):
+    """План запроса от самой базы, как EXPLAIN QUERY PLAN на SQLite."""
+    if not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.explain_query_prefix()} {sql}', params
+        )
+        rows = cursor.fetchall()
+    if connection.vendor != 'sqlite':
+        return '\n'.join(' '.join(map(str, row)) for row in rows)
+    # Строки SQLite — (id, parent, _, detail): рисуем дерево отступами.
+    depth = {0: 0}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, 0) + 1
+        lines.append('  ' * (depth[node] - 1) + detail)
+    return '\n'.join(lines)
+
+
+def _add(digest, ms, **details):
+    from core.models import SlowQuery
+
+    return SlowQuery.objects.filter(fingerprint=digest).update(
+        count=F('count') + 1,
+        total_ms=F('total_ms') + ms,
+        max_ms=Greatest('max_ms', Value(ms)),
+        last_seen=timezone.now(),
+        **details,
+    )
+
+
+def save(view, queries):
+    """Сохраняет медленные запросы, накопленные за один HTTP-запрос.
+
+    queries — словари с ключами alias, sql, params, ms и stack.
+    Запросы с одним отпечатком складываются в одну строку SlowQuery;
+    план и место вызова хранятся для самого медленного из них.
+    Ошибки журнала только логируются: ответ из-за них не ломается.
+    """
+    from core.models import SlowQuery
+
+    for query in queries:
+        logger.warning(
+            'Медленный запрос %.1f мс в %s: %s',
+            query['ms'], view, query['sql'][:500],
+        )
+        digest = fingerprint(query['sql'])
+        try:
+            row = SlowQuery.objects.filter(fingerprint=digest).values(
+                'max_ms'
+            ).first()
+            slowest = row is None or query['ms'] > row['max_ms']
+            details = {}
+            if slowest:
+                details = {
+                    'view': view,
+                    'example': f"{query['sql']}\n-- {query['params']!r}",
+                    'plan': explain(
+                        query['alias'], query['sql'], query['params']
+                    ),
+                    'stack': query['stack'],
+                }
+            if row is not None:
+                _add(digest, query['ms'], **details)
+                continue
+            try:
+                with transaction.atomic(using=SlowQuery.objects.db):
+                    SlowQuery.objects.create(
+                        fingerprint=digest,
+                        sql=normalize(query['sql']),
+                        total_ms=query['ms'],
+                        max_ms=query['ms'],
+                        **details,
+                    )
+            except IntegrityError:
+                # Ту же строку успел создать параллельный запрос.
+                _add(digest, query['ms'])
+        except DatabaseError:
+            logger.exception('Не удалось записать медленный запрос')
@@ -0,0 +1,36 @@
+import time
+
+from django.template import TemplateDoesNotExist
+from django.template.backends import django as backend
+
+from core import perf
+
+
+class Template(backend.Template):
+    def render(self, context=None, request=None):
+        recorder = perf.current()
+        if recorder is None or recorder.template_depth:
+            # Вложенные render() уже входят во время внешнего.
+            return super().render(context, request)
+        recorder.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            recorder.template_depth -= 1
+            recorder.add(
+                'template_ms', (time.perf_counter() - started) * 1000
+            )
+
+
+class DjangoTemplates(backend.DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых учитывает core.perf."""
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            backend.reraise(exc, self)
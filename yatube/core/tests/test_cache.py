@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from core.cache import SQLiteCache
+
+
+def increment(path, times):
+    backend = SQLiteCache(path, {})
+    for _ in range(times):
+        backend.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.path, {})
+
+    def test_basic_operations(self):
+        """get, set, add, delete и get_many работают как в BaseCache."""
+        self.cache.set('key', {'value': [1, 2]})
+        self.assertEqual(self.cache.get('key'), {'value': [1, 2]})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.assertEqual(
+            self.cache.get_many(['key', 'new', 'missing']),
+            {'key': {'value': [1, 2]}, 'new': 'value'},
+        )
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_ttl(self):
+        """Истёкшая запись не отдаётся и уступает место add."""
+        self.cache.set('key', 'value', 0.05)
+        self.assertTrue(self.cache.has_key('key'))
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr(self):
+        """incr меняет число и падает на отсутствующем ключе и не числе."""
+        self.cache.set('counter', 10, None)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.decr('counter'), 14)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'десять')
+        with self.assertRaisesMessage(ValueError, 'not an integer'):
+            self.cache.incr('text')
+        self.assertEqual(self.cache.get('text'), 'десять')
+
+    def test_shared_between_processes(self):
+        """Процессы видят записи друг друга, incr не теряет обновлений."""
+        self.cache.set('counter', 0, None)
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=increment, args=(self.path, 50))
+            for _ in range(4)
+        ]
+        for process in workers:
+            process.start()
+        for process in workers:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_lru_eviction(self):
+        """Сверх MAX_ENTRIES вытесняются давно не читавшиеся записи."""
+        cache = SQLiteCache(self.path, {
+            'OPTIONS': {'MAX_ENTRIES': 40, 'CULL_FREQUENCY': 4},
+        })
+        for index in range(40):
+            cache.set(f'key-{index}', index)
+        with cache._transaction() as connection:
+            connection.execute(
+                "UPDATE cache SET accessed = 0 WHERE key LIKE '%key-1_'"
+            )
+        for index in range(40, 50):
+            cache.set(f'key-{index}', index)
+        left = cache.get_many(f'key-{index}' for index in range(50))
+        self.assertEqual(len(left), 30)
+        self.assertNotIn('key-15', left)
+        self.assertEqual(left['key-49'], 49)
+
+    def test_bench_cache(self):
+        """Бенчмарк сравнивает бэкенды и проверяет атомарность incr."""
+        out = StringIO()
+        call_command(
+            'bench_cache', '--workers', '2', '--ops', '50', stdout=out
+        )
+        self.assertIn('locmem', out.getvalue())
+        self.assertIn('атомарно', out.getvalue())
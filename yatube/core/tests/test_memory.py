@@ -0,0 +1,73 @@
+import os
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import memory
+
+User = get_user_model()
+
+
+class MemoryProfileTests(TestCase):
+    def setUp(self):
+        self.url = reverse('core:memory_profile')
+        self.client.force_login(
+            User.objects.create_user(username='staff', is_staff=True)
+        )
+
+    def tearDown(self):
+        memory.stop()
+
+    def test_module_of(self):
+        django_file = os.path.join(
+            os.path.dirname(django.__file__), 'db', 'models', 'query.py'
+        )
+        self.assertEqual(memory.module_of(django_file), 'django.db')
+        self.assertEqual(
+            memory.module_of(os.path.join(settings.BASE_DIR, 'posts',
+                                          'views.py')),
+            'posts',
+        )
+
+    def test_snapshots_and_diff(self):
+        """Снимки по запросу и прирост между ними по модулям."""
+        first = self.client.post(self.url, {'action': 'snapshot'}).json()
+        self.assertTrue(first['tracing'])
+        leak = [bytearray(1024) for _ in range(1000)]
+        second = self.client.post(self.url, {'action': 'snapshot'}).json()
+        report = self.client.get(self.url, {
+            'snapshot': second['taken'], 'base': first['taken'],
+        }).json()['report']
+        modules = {entry['module']: entry for entry in report['modules']}
+        self.assertGreater(modules['core']['size_diff'], 1000 * 1024)
+        self.assertIn('test_memory.py', report['sites'][0]['site'])
+        del leak
+        self.client.post(self.url, {'action': 'stop'})
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertEqual(
+            self.client.get(self.url, {'snapshot': second['taken']})
+            .status_code, 404
+        )
+
+    def test_staff_only(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(User.objects.create_user(username='user'))
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    @override_settings(CORE_MEMORY_SNAPSHOTS=2)
+    def test_pinned_snapshot_kept(self):
+        """Закреплённый снимок переживает вытеснение, вытесненный —
+        понятная ошибка в отчёте."""
+        base = memory.take(pin=True)
+        first = memory.take()
+        for _ in range(3):
+            last = memory.take()
+        self.assertIsNone(memory.get(first))
+        self.assertEqual(memory.report(last, base)['base'], base)
+        with self.assertRaisesMessage(LookupError, f'Снимка {first} нет'):
+            memory.report(last, first)
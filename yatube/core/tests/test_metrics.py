@@ -0,0 +1,120 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+from posts import thumbnails
+
+TEMP_DIR = tempfile.mkdtemp()
+
+
+def samples(text):
+    """Текст Prometheus -> {'имя{метки}': значение}."""
+    return {
+        line.rsplit(' ', 1)[0]: float(line.rsplit(' ', 1)[1])
+        for line in text.splitlines() if line and not line.startswith('#')
+    }
+
+
+def child_process():
+    metrics.inc('yatube_thumbnails_total', (('result', 'created'),), 2)
+    metrics.flush(force=True)
+
+
+@override_settings(
+    CORE_METRICS_PATH=os.path.join(TEMP_DIR, 'metrics.sqlite3'),
+    CORE_METRICS_FLUSH_INTERVAL=0,
+)
+class MetricsTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+    def test_request_metrics(self):
+        """Запросы видны счётчиками, гистограммой и числом SQL."""
+        for _ in range(2):
+            self.client.get(reverse('posts:index'))
+        self.client.get('/no-such-page/')
+        response = self.client.get(reverse('core:metrics'))
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        text = response.content.decode()
+        values = samples(text)
+        self.assertEqual(values[
+            'yatube_http_requests_total'
+            '{view="posts:index",method="GET",status="200"}'
+        ], 2)
+        self.assertEqual(values[
+            'yatube_http_requests_total'
+            '{view="unresolved",method="GET",status="404"}'
+        ], 1)
+        self.assertIn(
+            '# TYPE yatube_http_request_duration_seconds histogram', text
+        )
+        bounds = re.findall(
+            r'^yatube_http_request_duration_seconds_bucket'
+            r'\{view="posts:index",le="([^"]+)"\} (\d+)$',
+            text, re.MULTILINE,
+        )
+        self.assertEqual(
+            [bound for bound, _ in bounds],
+            [*(str(bound) for bound in metrics.BUCKETS), '+Inf'],
+        )
+        counts = [int(count) for _, count in bounds]
+        self.assertEqual(counts, sorted(counts))
+        self.assertEqual(counts[-1], 2)
+        self.assertEqual(values[
+            'yatube_http_request_duration_seconds_count{view="posts:index"}'
+        ], 2)
+        self.assertGreater(
+            values['yatube_db_queries_total{view="posts:index"}'], 0
+        )
+        # Вторая главная уже из кэша лент.
+        self.assertGreater(values['yatube_cache_hits_total'], 0)
+        self.assertGreater(values['yatube_cache_misses_total'], 0)
+
+    def test_processes_aggregated(self):
+        """Счётчики процессов хоста складываются; несброшенное до
+        fork родительское дочерний процесс не досылает."""
+        metrics.inc('yatube_thumbnails_total', (('result', 'created'),))
+        process = multiprocessing.get_context('fork').Process(
+            target=child_process
+        )
+        process.start()
+        process.join()
+        self.assertEqual(process.exitcode, 0)
+        values = samples(metrics.render())
+        self.assertEqual(
+            values['yatube_thumbnails_total{result="created"}'], 3
+        )
+
+    def test_thumbnails_counted(self):
+        thumbnails.generate('posts/missing.jpg')
+        values = samples(metrics.render())
+        self.assertEqual(
+            values['yatube_thumbnails_total{result="skipped"}'], 1
+        )
+
+    def test_labels_escaped(self):
+        metrics.inc('yatube_http_requests_total', (('view', 'a"b\\c\n'),))
+        self.assertIn(
+            'yatube_http_requests_total{view="a\\"b\\\\c\\n"} 1',
+            metrics.render(),
+        )
+
+    @override_settings(CORE_METRICS_TOKEN='secret')
+    def test_token(self):
+        url = reverse('core:metrics')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
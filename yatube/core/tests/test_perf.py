@@ -0,0 +1,78 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core import perf
+
+User = get_user_model()
+
+
+def timing(response):
+    """Server-Timing -> {'db': {'dur': ..., 'desc': ...}, ...}."""
+    metrics = {}
+    for metric in response['Server-Timing'].split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(
+            re.match(r'(\w+)="?(.*?)"?$', param).groups() for param in params
+        )
+    return metrics
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        perf.stats.clear()
+
+    def test_server_timing(self):
+        """Заголовок Server-Timing перечисляет SQL, кэш и шаблоны."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:index'))
+        metrics = timing(response)
+        self.assertEqual(
+            metrics['db']['desc'], f'{len(queries.captured_queries)} queries'
+        )
+        self.assertGreater(float(metrics['tpl']['dur']), 0)
+        self.assertGreaterEqual(
+            float(metrics['total']['dur']), float(metrics['tpl']['dur'])
+        )
+        response = self.client.get(reverse('posts:index'))
+        hits = int(re.match(r'(\d+) hits', timing(response)['cache']['desc'])
+                   .group(1))
+        self.assertGreater(hits, 0)
+
+    @override_settings(CORE_PERF_SERVER_TIMING=False)
+    def test_server_timing_disabled(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_stats_endpoint(self):
+        """Статистика по представлениям видна только персоналу."""
+        for _ in range(3):
+            self.client.get(reverse('posts:index'))
+        self.client.get('/no-such-page/')
+        url = reverse('core:perf_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        views = self.client.get(url).json()['views']
+        index = views['posts:index']
+        self.assertEqual(index['count'], 3)
+        self.assertEqual(sum(index['histogram'].values()), 3)
+        self.assertGreater(index['avg_template_ms'], 0)
+        self.assertIsNotNone(index['p99_ms'])
+        self.assertEqual(views['unresolved']['count'], 1)
+
+    def test_window_rolls(self):
+        """Отрезки старше окна выпадают из статистики."""
+        values = dict.fromkeys(perf.FIELDS, 0)
+        values['total_ms'] = 30
+        now = 10 ** 9
+        perf.stats.add('old', values, now=now - perf.SLOT * perf.window())
+        perf.stats.add('new', values, now=now)
+        self.assertEqual(list(perf.stats.merged(now)), ['new'])
+        self.assertEqual(perf.quantile([0, 0, 1, 0], 0.5), perf.BUCKETS[2])
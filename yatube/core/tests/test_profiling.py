@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import profiling
+
+User = get_user_model()
+TEMP_DIR = tempfile.mkdtemp()
+
+
+@override_settings(CORE_PROFILE_DIR=TEMP_DIR, CORE_PROFILE_SAMPLE_RATE=0)
+class ProfilingMiddlewareTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+        self.url = reverse('posts:index')
+
+    def files(self):
+        if not os.path.isdir(TEMP_DIR):
+            return []
+        return sorted(os.listdir(TEMP_DIR))
+
+    def test_signed_header(self):
+        """С подписанным заголовком пишутся профиль и сводка."""
+        output = StringIO()
+        call_command('profile_token', stdout=output, stderr=StringIO())
+        header, token = output.getvalue().strip().split(': ')
+        self.assertEqual(header, profiling.HEADER)
+        response = self.client.get(self.url, HTTP_X_PROFILE=token)
+        name = response[profiling.HEADER]
+        self.assertEqual(self.files(), [name, name[:-5] + '.txt'])
+        self.assertIn('-posts_index-', name)
+        with open(os.path.join(TEMP_DIR, name[:-5] + '.txt')) as file:
+            summary = file.read()
+        self.assertIn(f'GET {self.url}', summary)
+        self.assertIn('cumulative', summary)
+
+    def test_forged_header(self):
+        response = self.client.get(
+            self.url, HTTP_X_PROFILE=profiling.make_token() + 'x'
+        )
+        self.assertNotIn(profiling.HEADER, response)
+        self.assertEqual(self.files(), [])
+
+    def test_staff_flag(self):
+        """Флаг ?profile действует только для персонала."""
+        user = User.objects.create_user(username='user')
+        self.client.force_login(user)
+        self.client.get(self.url, {'profile': ''})
+        self.assertEqual(self.files(), [])
+        user.is_staff = True
+        user.save()
+        response = self.client.get(self.url, {'profile': ''})
+        self.assertIn(profiling.HEADER, response)
+
+    @override_settings(CORE_PROFILE_SAMPLE_RATE=1, CORE_PROFILE_KEEP=2)
+    def test_sample_rotates(self):
+        """Выборочные профили не светятся в ответе и вытесняются."""
+        for _ in range(3):
+            response = self.client.get(self.url)
+            self.assertNotIn(profiling.HEADER, response)
+        self.assertEqual(len(self.files()), 4)
@@ -0,0 +1,85 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import slowlog
+from core.models import SlowQuery
+from posts.models import Post
+
+User = get_user_model()
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username='author')
+        Post.objects.create(author=author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_normalize(self):
+        """Литералы, параметры и списки IN не меняют отпечаток."""
+        self.assertEqual(
+            slowlog.normalize(
+                "SELECT *  FROM t WHERE a = 'x''y' AND b IN (%s, %s)\n"
+                "AND c > 10"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c > ?',
+        )
+        self.assertEqual(
+            slowlog.fingerprint('SELECT 1 FROM t WHERE id IN (%s)'),
+            slowlog.fingerprint('SELECT 2 FROM t WHERE id IN (%s, %s)'),
+        )
+
+    @override_settings(CORE_SLOW_QUERY_MS=0)
+    def test_slow_queries_captured(self):
+        """Запросы дольше порога пишутся с планом, видом и стеком."""
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(reverse('posts:post_detail', args=[1]))
+        query = SlowQuery.objects.get(
+            sql__contains='FROM "posts_post"',
+            sql__icontains='"posts_authorstats"',
+        )
+        self.assertEqual(query.view, 'posts:post_detail')
+        self.assertEqual(query.count, 1)
+        self.assertIn('posts_post', query.plan)
+        self.assertIn('posts/views.py', query.stack)
+        self.assertIn('-- (1,)', query.example)
+        cache.clear()
+        with self.assertLogs('core.slowlog', 'WARNING'):
+            self.client.get(reverse('posts:post_detail', args=[1]))
+        query.refresh_from_db()
+        self.assertEqual(query.count, 2)
+        self.assertGreaterEqual(query.total_ms, query.max_ms)
+
+    def test_fast_queries_ignored(self):
+        """Быстрые запросы при обычном пороге в журнал не попадают."""
+        self.client.get(reverse('posts:index'))
+        self.assertFalse(SlowQuery.objects.exists())
+
+    def test_report(self):
+        """Отчёт выводит частых нарушителей первыми."""
+        SlowQuery.objects.create(
+            fingerprint='a', sql='SELECT rare', view='posts:index',
+            total_ms=200, max_ms=200,
+        )
+        SlowQuery.objects.create(
+            fingerprint='b', sql='SELECT often', view='posts:profile',
+            count=10, total_ms=1500, max_ms=300, plan='SCAN posts_post',
+        )
+        out = StringIO()
+        call_command('slow_queries', '--details', stdout=out)
+        report = out.getvalue()
+        self.assertLess(report.index('SELECT often'),
+                        report.index('SELECT rare'))
+        self.assertIn('SCAN posts_post', report)
+        out = StringIO()
+        call_command('slow_queries', '--view=posts:index', stdout=out)
+        self.assertNotIn('SELECT often', out.getvalue())
+        call_command('slow_queries', '--clear', stdout=StringIO())
+        self.assertFalse(SlowQuery.objects.exists())
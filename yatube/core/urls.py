@@ -0,0 +1,10 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'core'
+urlpatterns = [
+    path('metrics', views.prometheus_metrics, name='metrics'),
+    path('perf/stats/', views.perf_stats, name='perf_stats'),
+    path('perf/memory/', views.memory_profile, name='memory_profile'),
+]
@@ -1,4 +1,13 @@
+import hmac
+
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse,
+)
 from django.shortcuts import render
+from django.views.decorators.http import require_http_methods
+
+from core import memory, metrics, perf
 
 
 def page_not_found(request, exception):
@@ -13,3 +22,58 @@ def csrf_failure(request, reason=''):
 
 def internal_server_error(request):
     return render(request, 'core/500.html', status=500)
+
+
+@staff_member_required
+def perf_stats(request):
+    """Скользящая статистика запросов процесса, ответившего на запрос."""
+    return JsonResponse(perf.summary())
+
+
+def prometheus_metrics(request):
+    """Метрики всех процессов хоста в текстовом формате Prometheus.
+
+    Если задан CORE_METRICS_TOKEN, сборщик должен прислать его
+    в заголовке Authorization: Bearer <токен>.
+    """
+    token = metrics.token()
+    if token is not None:
+        sent = request.META.get('HTTP_AUTHORIZATION', '')
+        if not hmac.compare_digest(sent, f'Bearer {token}'):
+            return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+
+def _number(value):
+    return int(value) if value and value.isdigit() else None
+
+
+@staff_member_required
+@require_http_methods(['GET', 'POST'])
+def memory_profile(request):
+    """Снимки tracemalloc процесса, ответившего на запрос.
+
+    POST с action=start|snapshot|stop|clear управляет трассировкой.
+    GET отдаёт состояние, а с ?snapshot=N — места выделения памяти
+    снимка по модулям и строкам; с &base=M — прирост от снимка M.
+    """
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action not in ('start', 'snapshot', 'stop', 'clear'):
+            return HttpResponseBadRequest('action: start|snapshot|stop|clear')
+        taken = memory.take() if action == 'snapshot' else None
+        if action != 'snapshot':
+            getattr(memory, action)()
+        return JsonResponse({**memory.status(), 'taken': taken})
+    result = memory.status()
+    number = _number(request.GET.get('snapshot'))
+    if number is not None:
+        base = _number(request.GET.get('base'))
+        if memory.get(number) is None or (
+            base is not None and memory.get(base) is None
+        ):
+            return JsonResponse({'error': 'Нет такого снимка'}, status=404)
+        result['report'] = memory.report(
+            number, base, limit=_number(request.GET.get('limit')) or 20
+        )
+    return JsonResponse(result)
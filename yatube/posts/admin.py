@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Comment, Follow, Group, Post
 
 
@@ -10,6 +11,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ищем по FTS5-индексу текста вместо icontains по всей таблице.
+        if not search.available() or not search.match_expression(
+            search_term
+        ):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(
+            pk__in=search.matching_ids(search_term, column='text')
+        ), False
+
 
 admin.site.register(Post, PostAdmin)
 
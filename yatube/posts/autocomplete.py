@@ -0,0 +1,123 @@
+import bisect
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.urls import reverse
+
+from .models import Group, User
+
+VERSION_PREFIX = 'autocomplete-version'
+LIMIT = 10
+
+
+def normalize(text):
+    return text.casefold().replace('ё', 'е')
+
+
+class PrefixIndex:
+    """Отсортированный в памяти процесса индекс для поиска по префиксу.
+
+    load() возвращает пары (ключ, запись); у записи может быть
+    несколько ключей, например название и slug группы. Поиск —
+    два bisect по списку ключей, без запросов к базе. Индекс
+    пересобирается, когда в общем кэше сменилось его поколение:
+    так правка в одном процессе видна во всех остальных.
+    """
+
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self.version = None
+        self.keys = []
+        self.items = []
+        self.lock = threading.Lock()
+
+    @property
+    def version_key(self):
+        return f'{VERSION_PREFIX}:{self.name}'
+
+    def current_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, time.time_ns(), None)
+            version = cache.get(self.version_key)
+        return version
+
+    def refresh(self):
+        version = self.current_version()
+        if version == self.version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            pairs = sorted(
+                ((normalize(key), position), item)
+                for position, (key, item) in enumerate(self.load())
+            )
+            # Ключи и записи подменяются одной парой: параллельный
+            # поиск видит либо старый индекс, либо новый целиком.
+            self.keys, self.items = (
+                [key for key, _ in pairs], [item for _, item in pairs]
+            )
+            self.version = version
+
+    def search(self, prefix, limit=LIMIT):
+        """До limit записей, у которых какой-то ключ начинается с prefix."""
+        prefix = normalize(prefix.strip())
+        if not prefix:
+            return []
+        self.refresh()
+        keys, items = self.keys, self.items
+        start = bisect.bisect_left(keys, (prefix,))
+        stop = bisect.bisect_left(keys, (prefix + '\U0010ffff',), start)
+        found = []
+        for item in items[start:stop]:
+            if item not in found:
+                found.append(item)
+                if len(found) == limit:
+                    break
+        return found
+
+    def _bump(self):
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), None)
+
+    def invalidate(self):
+        """Помечает индекс устаревшим во всех процессах.
+
+        Как и page_cache.bump, поколение сдвигается ещё раз после
+        коммита, чтобы индекс, собранный до него, не остался новым.
+        """
+        self._bump()
+        transaction.on_commit(self._bump)
+
+
+def load_groups():
+    for pk, title, slug in Group.objects.values_list('pk', 'title', 'slug'):
+        item = {'id': pk, 'title': title, 'slug': slug}
+        yield title, item
+        yield slug, item
+
+
+def load_users():
+    users = User.objects.filter(is_active=True).values_list(
+        'username', 'first_name', 'last_name'
+    )
+    for username, first_name, last_name in users.iterator():
+        item = {
+            'username': username,
+            'full_name': f'{first_name} {last_name}'.strip(),
+            'url': reverse('posts:profile', args=[username]),
+        }
+        yield username, item
+        for name in (first_name, last_name):
+            if name:
+                yield name, item
+
+
+groups = PrefixIndex('groups', load_groups)
+users = PrefixIndex('users', load_users)
@@ -0,0 +1,167 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+
+
+def count_of(model, field):
+    """Подзапрос «сколько строк model ссылаются на текущую через field»."""
+    counted = model.objects.filter(**{field: OuterRef('pk')}).order_by()
+    return Coalesce(
+        Subquery(
+            counted.values(field).annotate(total=Count('pk')).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def actual_author_stats(user_ids=None):
+    users = User.objects.annotate(
+        actual_posts=count_of(Post, 'author'),
+        actual_followers=count_of(Follow, 'author'),
+        actual_following=count_of(Follow, 'user'),
+    )
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    return users
+
+
+def _stats_from(user):
+    return AuthorStats(
+        user_id=user.pk,
+        posts_count=user.actual_posts,
+        followers_count=user.actual_followers,
+        following_count=user.actual_following,
+    )
+
+
+def bump_author(user_id, **deltas):
+    """Сдвигает счётчики пользователя на deltas.
+
+    Если строки счётчиков ещё нет, она создаётся сразу с точными
+    значениями, посчитанными по таблицам. Уменьшение отсутствующей
+    строки пропускается: так бывает при каскадном удалении
+    пользователя, когда его счётчики уже удалены.
+    """
+    updated = AuthorStats.objects.filter(user_id=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        AuthorStats.objects.bulk_create(
+            [_stats_from(user) for user in actual_author_stats([user_id])],
+            ignore_conflicts=True,
+        )
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def post_added(post):
+    bump_author(post.author_id, posts_count=1)
+    bump_group(post.group_id, 1)
+
+
+def post_moved(old_group_id, new_group_id):
+    if old_group_id != new_group_id:
+        bump_group(old_group_id, -1)
+        bump_group(new_group_id, 1)
+
+
+def post_removed(post):
+    bump_author(post.author_id, posts_count=-1)
+    bump_group(post.group_id, -1)
+
+
+def follow_added(follow):
+    bump_author(follow.author_id, followers_count=1)
+    bump_author(follow.user_id, following_count=1)
+
+
+def follow_removed(follow):
+    bump_author(follow.author_id, followers_count=-1)
+    bump_author(follow.user_id, following_count=-1)
+
+
+def _reconcile(queryset, fields, fix):
+    """Сверяет сохранённые счётчики с подсчитанными заново.
+
+    fields — пары (поле счётчика, аннотация с точным значением).
+    Возвращает число строк с расхождением; при fix=True исправляет их.
+    """
+    drifted = []
+    for obj in queryset.iterator():
+        changed = False
+        for field, actual in fields:
+            if getattr(obj, field) != getattr(obj, actual):
+                setattr(obj, field, getattr(obj, actual))
+                changed = True
+        if changed:
+            drifted.append(obj)
+    if fix and drifted:
+        queryset.model.objects.bulk_update(
+            drifted, [field for field, _ in fields], batch_size=BATCH_SIZE
+        )
+    return len(drifted)
+
+
+def reconcile(fix=True):
+    """Пересчитывает все счётчики и возвращает расхождения по видам."""
+    report = {
+        'posts.comments_count': _reconcile(
+            Post.objects.annotate(
+                actual_comments=count_of(Comment, 'post')
+            ).only('pk', 'comments_count'),
+            [('comments_count', 'actual_comments')],
+            fix,
+        ),
+        'groups.posts_count': _reconcile(
+            Group.objects.annotate(
+                actual_posts=count_of(Post, 'group')
+            ).only('pk', 'posts_count'),
+            [('posts_count', 'actual_posts')],
+            fix,
+        ),
+    }
+    missing = [
+        _stats_from(user)
+        for user in actual_author_stats().filter(stats__isnull=True).filter(
+            Q(actual_posts__gt=0)
+            | Q(actual_followers__gt=0)
+            | Q(actual_following__gt=0)
+        )
+    ]
+    if fix:
+        AuthorStats.objects.bulk_create(
+            missing, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+    report['authors.missing'] = len(missing)
+    report['authors.counts'] = _reconcile(
+        AuthorStats.objects.annotate(
+            actual_posts=count_of(Post, 'author'),
+            actual_followers=count_of(Follow, 'author'),
+            actual_following=count_of(Follow, 'user'),
+        ),
+        [
+            ('posts_count', 'actual_posts'),
+            ('followers_count', 'actual_followers'),
+            ('following_count', 'actual_following'),
+        ],
+        fix,
+    )
+    return report
@@ -0,0 +1,232 @@
+from django.conf import settings
+from django.db.models import Q
+
+from . import utils
+from .models import AuthorStats, Follow, Post, Timeline
+
+TIMELINE_KEYS = ('pub_date', 'post_id')
+BATCH_SIZE = 500
+
+
+def timeline_backfill_size():
+    """Сколько последних постов автора попадает в ленту при подписке."""
+    return getattr(settings, 'POSTS_TIMELINE_BACKFILL', 200)
+
+
+def fanout_limit():
+    """Порог подписчиков, выше которого посты автора не раскладываются.
+
+    Такие авторы читаются из их собственных постов в момент запроса
+    ленты (pull), остальные — из материализованной ленты (push).
+    None отключает pull, 0 отключает push.
+    """
+    return getattr(settings, 'POSTS_FANOUT_FOLLOWER_LIMIT', 1000)
+
+
+def fanout_push_limit():
+    """Порог подписчиков, до которого автор возвращается в push.
+
+    Не выше fanout_limit(): между порогами автор остаётся в том
+    режиме, в котором был (AuthorStats.fanout_pulled).
+    """
+    limit = fanout_limit()
+    if limit is None:
+        return None
+    return min(getattr(settings, 'POSTS_FANOUT_PUSH_LIMIT', 800), limit)
+
+
+def _pulled(limit, prefix=''):
+    return (
+        Q(**{f'{prefix}followers_count__gt': limit})
+        | Q(**{f'{prefix}fanout_pulled': True})
+    )
+
+
+def is_pulled(author_id):
+    limit = fanout_limit()
+    if limit is None:
+        return False
+    return AuthorStats.objects.filter(
+        _pulled(limit), user_id=author_id
+    ).exists()
+
+
+def pulled_authors(user_id):
+    """Авторы из подписок читателя, чьи посты читаются при запросе."""
+    limit = fanout_limit()
+    if limit is None:
+        return []
+    return list(
+        Follow.objects.filter(
+            _pulled(limit, 'author__stats__'), user_id=user_id
+        ).values_list('author_id', flat=True)
+    )
+
+
+def _entries(user_ids, post):
+    return [
+        Timeline(
+            user_id=user_id,
+            post=post,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in user_ids
+    ]
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам всех подписчиков автора."""
+    if is_pulled(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    Timeline.objects.bulk_create(
+        _entries(followers.iterator(), post),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-pk'
+    ).only('pk', 'author_id', 'pub_date')[:timeline_backfill_size()]
+    Timeline.objects.bulk_create(
+        [
+            Timeline(
+                user_id=user_id,
+                post_id=post.pk,
+                author_id=author_id,
+                pub_date=post.pub_date,
+            )
+            for post in posts
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    Timeline.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def follow_added(user_id, author_id):
+    """Подписка: дополняет ленту читателя или, если автор перешёл
+    порог, запоминает, что его посты теперь читаются через pull."""
+    if not is_pulled(author_id):
+        backfill(user_id, author_id)
+        return
+    AuthorStats.objects.filter(
+        user_id=author_id, followers_count__gt=fanout_limit(),
+        fanout_pulled=False,
+    ).update(fanout_pulled=True)
+
+
+def follow_removed(user_id, author_id):
+    """Отписка только чистит ленту читателя.
+
+    Обратно в push автора переводит restore_pushed() вне запроса:
+    дополнять ленты всех оставшихся подписчиков здесь — это сотни
+    тысяч строк в одном HTTP-запросе.
+    """
+    trim(user_id, author_id)
+
+
+def restore_pushed(batch_size=BATCH_SIZE):
+    """Возвращает в push авторов, опустившихся до fanout_push_limit().
+
+    Флаг снимается до дополнения лент: подписки и посты после этого
+    уже идут обычным push, а повторный backfill безопасен
+    (ignore_conflicts). Подписчики обходятся пачками по batch_size.
+    Возвращает пары (автор, число дополненных лент).
+    """
+    pending = AuthorStats.objects.filter(fanout_pulled=True)
+    push_limit = fanout_push_limit()
+    if push_limit is not None:
+        pending = pending.filter(followers_count__lte=push_limit)
+    restored = []
+    for author_id in list(pending.values_list('user_id', flat=True)):
+        # Условие повторяется в UPDATE: за это время автор мог снова
+        # набрать подписчиков или его уже вернул параллельный прогон.
+        if not pending.filter(user_id=author_id).update(
+            fanout_pulled=False
+        ):
+            continue
+        filled = 0
+        last = 0
+        while True:
+            followers = list(
+                Follow.objects.filter(
+                    author_id=author_id, user_id__gt=last
+                ).order_by('user_id').values_list(
+                    'user_id', flat=True
+                )[:batch_size]
+            )
+            if not followers:
+                break
+            for follower_id in followers:
+                backfill(follower_id, author_id)
+            filled += len(followers)
+            last = followers[-1]
+        restored.append((author_id, filled))
+    return restored
+
+
+def rebuild_timeline(user_id):
+    """Пересобирает ленту читателя с нуля по текущим подпискам."""
+    Timeline.objects.filter(user_id=user_id).delete()
+    pulled = set(pulled_authors(user_id))
+    author_ids = Follow.objects.filter(
+        user_id=user_id
+    ).values_list('author_id', flat=True)
+    for author_id in author_ids:
+        if author_id not in pulled:
+            backfill(user_id, author_id)
+
+
+def _timeline_post(entry):
+    return entry.post
+
+
+def _same_post(post):
+    return post
+
+
+def timeline_page(request, user):
+    """Страница ленты подписок.
+
+    Push-часть — проход по индексу (user, -pub_date) ленты читателя,
+    pull-часть — по потоку постов каждого популярного автора; потоки
+    сливаются MergedCursorPaginator.
+    """
+    entries = Timeline.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    )
+    pulled = pulled_authors(user.pk)
+    if not pulled:
+        page_obj = utils.paginator(request, entries, keys=TIMELINE_KEYS)
+        page_obj.object_list = [
+            entry.post for entry in page_obj.object_list
+        ]
+        return page_obj
+    streams = [(entries, TIMELINE_KEYS, _timeline_post)]
+    streams.extend(
+        (
+            Post.objects.filter(author_id=author_id).select_related(
+                'author', 'group'
+            ),
+            utils.CURSOR_KEYS,
+            _same_post,
+        )
+        for author_id in pulled
+    )
+    return utils.MergedCursorPaginator(
+        Post.objects.all(), utils.ORDER, streams
+    ).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -1,7 +1,54 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
+from django.urls import reverse_lazy
+from django.utils.html import format_html
 
+from . import images
 from .models import Comment, Group, Post
 
+IMAGE_METADATA = {
+    'image_width': None,
+    'image_height': None,
+    'image_size': None,
+    'image_hash': '',
+    'image_placeholder': '',
+}
+
+
+class GroupAutocomplete(forms.Widget):
+    """Поле группы с подсказками вместо <select> со всеми группами.
+
+    Пишет id группы в скрытое поле, а название ищет по мере ввода
+    через posts:autocomplete_groups. Из базы читается только
+    выбранная группа, чтобы показать её название.
+    """
+
+    url = reverse_lazy('posts:autocomplete_groups')
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def id_for_label(self, id_):
+        return id_
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        field_id = attrs.get('id', f'id_{name}')
+        title = ''
+        if value:
+            title = Group.objects.filter(pk=value).values_list(
+                'title', flat=True
+            ).first() or ''
+        return format_html(
+            '<input type="hidden" name="{}" id="{}_value" value="{}">'
+            '<input type="text" id="{}" class="form-control" value="{}" '
+            'list="{}_list" autocomplete="off" data-autocomplete="{}" '
+            'data-target="{}_value">'
+            '<datalist id="{}_list"></datalist>',
+            name, field_id, value or '', field_id, title,
+            field_id, self.url, field_id, field_id,
+        )
+
 
 class PostForm(forms.ModelForm):
 
@@ -24,9 +71,44 @@ class PostForm(forms.ModelForm):
             'image': "Изображение поста"
         }
         widgets = {
-            'text': forms.Textarea(attrs={'cols': 150, 'row': 100, })
+            'text': forms.Textarea(attrs={'cols': 150, 'row': 100, }),
+            'group': GroupAutocomplete(),
         }
 
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            try:
+                image, metadata = images.normalize(image)
+            except OSError:
+                raise forms.ValidationError(
+                    'Не удалось обработать изображение.'
+                )
+        elif not image:
+            metadata = IMAGE_METADATA
+        else:
+            return image
+        for field, value in metadata.items():
+            setattr(self.instance, field, value)
+        return image
+
+    def save(self, commit=True):
+        """Правка поста пишет только поля формы и данные картинки.
+
+        Денормализованный comments_count тем временем меняется через
+        F(): полное сохранение затёрло бы его значением, прочитанным
+        в начале запроса.
+        """
+        if not commit or self.instance._state.adding:
+            return super().save(commit)
+        post = super().save(commit=False)
+        fields = list(self._meta.fields)
+        if 'image' in self.changed_data:
+            fields += [*IMAGE_METADATA, 'image_variants']
+        post.save(update_fields=fields)
+        self._save_m2m()
+        return post
+
 
 class CommentForm(forms.ModelForm):
 
@@ -0,0 +1,196 @@
+import base64
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+from .models import Post
+
+# Кадр ленты: тот же, что у {% thumbnail ... "960x339" crop="center" %}.
+FRAME = (960, 339)
+# Ширины вариантов для srcset; все с пропорциями кадра ленты.
+WIDTHS = (320, 640, 960)
+SIZES = '(max-width: 960px) 100vw, 960px'
+# Расширение оригинала -> формат PIL и режим для его вариантов.
+FORMATS = {
+    'jpg': ('JPEG', 'RGB'),
+    'jpeg': ('JPEG', 'RGB'),
+    'png': ('PNG', 'RGBA'),
+    'gif': ('GIF', 'RGB'),
+}
+WEBP = 'webp'
+# Заглушка до загрузки картинки: кадр ленты шириной в 16 пикселей,
+# растянутый браузером. PNG такого размера — несколько сотен байт.
+PLACEHOLDER_WIDTH = 16
+# Форматы, которые Pillow читает, но не пишет, и чем их заменить.
+SAVE_FORMATS = {'MPO': 'JPEG'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'WEBP': {'quality': 90},
+    'PNG': {'optimize': True},
+}
+
+
+def max_side():
+    """Наибольшая сторона оригинала после загрузки, в пикселях."""
+    return getattr(settings, 'POSTS_IMAGE_MAX_SIDE', 2048)
+
+
+def normalize(upload):
+    """Приводит загруженную картинку к виду, в котором её хранят.
+
+    Поворачивает по EXIF-ориентации, уменьшает до max_side() по
+    большей стороне и пересохраняет без EXIF, сохраняя цветовой
+    профиль. Анимацию не трогаем, чтобы не потерять кадры.
+    Возвращает файл и поля Post с размерами, объёмом и хешем.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        content = upload.read()
+    else:
+        image_format = SAVE_FORMATS.get(image.format, image.format)
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side(), max_side()), Image.LANCZOS)
+        if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        options = dict(SAVE_OPTIONS.get(image_format, {}))
+        if icc_profile:
+            options['icc_profile'] = icc_profile
+        buffer = BytesIO()
+        image.save(buffer, image_format, **options)
+        content = buffer.getvalue()
+    return ContentFile(content, name=upload.name), metadata(image, content)
+
+
+def metadata(image, content):
+    """Поля Post для картинки image, сохранённой как байты content."""
+    width, height = image.size
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_size': len(content),
+        'image_hash': hashlib.sha256(content).hexdigest(),
+        'image_placeholder': placeholder(image),
+    }
+
+
+def metadata_for(name):
+    """Поля Post для уже сохранённого файла картинки name."""
+    storage = Post._meta.get_field('image').storage
+    with storage.open(name) as file:
+        content = file.read()
+    image = Image.open(BytesIO(content))
+    image.load()
+    return metadata(ImageOps.exif_transpose(image), content)
+
+
+def placeholder(image):
+    """data: URI крошечной копии кадра ленты из картинки image."""
+    width, height = FRAME
+    size = (PLACEHOLDER_WIDTH, round(height * PLACEHOLDER_WIDTH / width))
+    frame = ImageOps.fit(image.convert('RGB'), size, Image.LANCZOS)
+    buffer = BytesIO()
+    frame.save(buffer, 'PNG', optimize=True)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+def display_size(post, fallback):
+    """Ширина и высота <img> картинки поста на странице.
+
+    Миниатюра и варианты — это кадр ленты FRAME. Пока миниатюры нет,
+    бэкенд отдаёт вместо неё оригинал: его размеры берём из базы,
+    вписав в ширину кадра, чтобы не исказить пропорции и не открывать
+    файл в запросе.
+    """
+    if fallback.name != post.image.name or not post.image_width:
+        return FRAME
+    width = min(post.image_width, FRAME[0])
+    return width, max(round(post.image_height * width / post.image_width), 1)
+
+
+def useful_widths(post, widths):
+    """Ширины вариантов для srcset без растянутых сверх оригинала.
+
+    Вариант шире пикселей, попавших из оригинала в кадр, тяжелее,
+    но не чётче: оставляем ширины до первой, что их покрывает.
+    Без размеров в базе (пост до их появления) — все ширины.
+    """
+    if not post.image_width or not post.image_height:
+        return widths
+    width, height = FRAME
+    source = min(post.image_width, post.image_height * width / height)
+    useful = []
+    for variant in sorted(widths):
+        useful.append(variant)
+        if variant >= source:
+            break
+    return useful
+
+
+def webp_supported():
+    return features.check('webp')
+
+
+def variant_name(name, width, extension):
+    """posts/cat.jpg -> posts/cat.640w.webp: рядом с оригиналом."""
+    stem, _ = os.path.splitext(name)
+    return f'{stem}.{width}w.{extension}'
+
+
+def variant_formats(name):
+    """Форматы вариантов файла name: (расширение, формат PIL, режим)."""
+    extension = os.path.splitext(name)[1].lower().lstrip('.')
+    if extension not in FORMATS:
+        extension = 'jpg'
+    formats = [(extension, *FORMATS[extension])]
+    if webp_supported():
+        formats.append((WEBP, 'WEBP', 'RGBA'))
+    return formats
+
+
+def _save(image, name, pil_format):
+    buffer = BytesIO()
+    image.save(buffer, pil_format, quality=80)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def make_variants(name):
+    """Создаёт варианты кадра ленты всех ширин WIDTHS для файла name.
+
+    Варианты есть в исходном формате и, если Pillow собран с WebP,
+    в WebP. Готовые ширины записываются в Post.image_variants.
+    """
+    with default_storage.open(name) as file:
+        source = Image.open(file)
+        source.load()
+    width, height = FRAME
+    for variant_width in WIDTHS:
+        size = (variant_width, round(height * variant_width / width))
+        frame = ImageOps.fit(source.convert('RGBA'), size, Image.LANCZOS)
+        for extension, pil_format, mode in variant_formats(name):
+            _save(
+                frame.convert(mode),
+                variant_name(name, variant_width, extension),
+                pil_format,
+            )
+    widths = ','.join(str(width) for width in WIDTHS)
+    Post.objects.filter(image=name).update(image_variants=widths)
+    return widths
+
+
+def srcset(name, widths, extension):
+    return ', '.join(
+        f'{default_storage.url(variant_name(name, width, extension))} '
+        f'{width}w'
+        for width in widths
+    )
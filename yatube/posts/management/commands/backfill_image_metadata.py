@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from posts import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет размеры, объём, хеш и заглушку картинки у постов, '
+        'загруженных до появления этих полей или в обход формы поста.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        pending = Post.objects.exclude(image='').filter(
+            Q(image_width__isnull=True) | Q(image_height__isnull=True)
+            | Q(image_size__isnull=True) | Q(image_hash='')
+            | Q(image_placeholder='')
+        )
+        filled = 0
+        failed = 0
+        last = ''
+        while True:
+            # Постранично по имени файла: один файл читается один раз
+            # для всех постов, которые на него ссылаются.
+            batch = list(
+                pending.filter(image__gt=last).order_by('image')
+                .values_list('image', flat=True)
+                .distinct()[:options['batch_size']]
+            )
+            if not batch:
+                break
+            for name in batch:
+                try:
+                    fields = images.metadata_for(name)
+                except OSError as error:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                    continue
+                filled += Post.objects.filter(image=name).update(**fields)
+            last = batch[-1]
+        self.stdout.write(f'Заполнено постов: {filled}, ошибок: {failed}.')
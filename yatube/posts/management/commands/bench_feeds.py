@@ -0,0 +1,139 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from posts import counters, feeds
+from posts.models import Follow, Post, Timeline
+
+User = get_user_model()
+
+MODES = ('push', 'pull', 'hybrid')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает push, pull и hybrid ленты подписок на синтетическом '
+        'графе подписок. Все данные создаются внутри транзакции '
+        'и откатываются.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=50)
+        parser.add_argument('--readers', type=int, default=500)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на одного читателя.'
+        )
+        parser.add_argument(
+            '--posts', type=int, default=5,
+            help='Постов на одного автора.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного закона популярности авторов.'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=100,
+            help='Порог подписчиков для hybrid-режима.'
+        )
+        parser.add_argument('--pages', type=int, default=3)
+        parser.add_argument('--sample', type=int, default=50)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        graph = self.follow_graph(rng, options)
+        limits = {
+            'push': None,
+            'pull': 0,
+            'hybrid': options['limit'],
+        }
+        self.stdout.write(
+            f'{"mode":<8}{"write s":>10}{"rows":>10}'
+            f'{"read p50 ms":>14}{"read p95 ms":>14}{"queries":>10}'
+        )
+        for mode in MODES:
+            with override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=limits[mode]):
+                result = self.run_mode(graph, options)
+            self.stdout.write(
+                f'{mode:<8}{result["write"]:>10.2f}{result["rows"]:>10}'
+                f'{result["p50"]:>14.2f}{result["p95"]:>14.2f}'
+                f'{result["queries"]:>10.1f}'
+            )
+
+    def follow_graph(self, rng, options):
+        """Пары (читатель, автор) с популярностью авторов по Ципфу."""
+        authors = range(options['authors'])
+        weights = [1 / (rank + 1) ** options['alpha'] for rank in authors]
+        per_reader = min(options['follows'], options['authors'])
+        graph = []
+        for reader in range(options['readers']):
+            chosen = set()
+            while len(chosen) < per_reader:
+                chosen.add(rng.choices(authors, weights)[0])
+            graph.extend((reader, author) for author in sorted(chosen))
+        return graph
+
+    def run_mode(self, graph, options):
+        with transaction.atomic():
+            authors = self.create_users('bench-author', options['authors'])
+            readers = self.create_users('bench-reader', options['readers'])
+            Follow.objects.bulk_create(
+                Follow(user=readers[reader], author=authors[author])
+                for reader, author in graph
+            )
+            # bulk_create не шлёт сигналов: счётчики подписчиков,
+            # по которым выбирается pull, пересчитываем явно.
+            counters.reconcile()
+            started = time.perf_counter()
+            for _ in range(options['posts']):
+                for author in authors:
+                    Post.objects.create(author=author, text='bench')
+            write = time.perf_counter() - started
+            rows = Timeline.objects.filter(user__in=readers).count()
+            timings, queries = self.read(readers, options)
+            transaction.set_rollback(True)
+        timings.sort()
+        return {
+            'write': write,
+            'rows': rows,
+            'p50': statistics.median(timings),
+            'p95': timings[int(len(timings) * 0.95) - 1],
+            'queries': statistics.mean(queries),
+        }
+
+    def create_users(self, prefix, count):
+        # bulk_create на SQLite не возвращает pk, поэтому перечитываем.
+        User.objects.bulk_create(
+            User(username=f'{prefix}-{index}') for index in range(count)
+        )
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}-')
+            .order_by('pk')
+        )
+
+    def read(self, readers, options):
+        factory = RequestFactory()
+        timings = []
+        queries = []
+        for reader in readers[:options['sample']]:
+            cursor = None
+            for _ in range(options['pages']):
+                request = factory.get(
+                    '/follow/', {'after': cursor} if cursor else {}
+                )
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    page_obj = feeds.timeline_page(request, reader)
+                    timings.append((time.perf_counter() - started) * 1000)
+                queries.append(len(captured.captured_queries))
+                if not page_obj.has_next():
+                    break
+                cursor = page_obj.next_cursor
+        return timings, queries
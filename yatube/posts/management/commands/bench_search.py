@@ -0,0 +1,118 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from posts import search
+from posts.models import Post
+
+User = get_user_model()
+
+SYLLABLES = (
+    'ка ло ми ну ра се ти ку до ва ре ша мо ле за пи бу ро ты ня'
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает поиск по FTS5-индексу с icontains по тексту постов '
+        'на синтетических постах. Данные создаются внутри транзакции '
+        'и откатываются; для замера на миллионе постов — --posts 1000000.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--words', type=int, default=30, help='Слов в посте.'
+        )
+        parser.add_argument(
+            '--vocabulary', type=int, default=20000,
+            help='Размер словаря; частоты слов — по закону Ципфа.'
+        )
+        parser.add_argument('--queries', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        if not search.available():
+            self.stderr.write('FTS5-индекс есть только на SQLite.')
+            return
+        rng = random.Random(options['seed'])
+        vocabulary = self.vocabulary(rng, options['vocabulary'])
+        # Запросы из слов средней частоты: и частые, и редкие, и такие,
+        # которых нет ни в одном посте.
+        queries = [
+            ' '.join(rng.sample(vocabulary[10:], rng.randint(1, 2)))
+            for _ in range(options['queries'])
+        ]
+        with transaction.atomic():
+            started = time.perf_counter()
+            self.create_posts(rng, vocabulary, options)
+            self.stdout.write(
+                f'Постов: {options["posts"]}, вставка с индексом: '
+                f'{time.perf_counter() - started:.1f} с'
+            )
+            self.stdout.write(
+                f'{"mode":<12}{"p50 ms":>10}{"p95 ms":>10}{"hits":>10}'
+            )
+            for mode in ('fts', 'fts-page2', 'icontains'):
+                timings, hits = self.run(mode, queries)
+                timings.sort()
+                self.stdout.write(
+                    f'{mode:<12}{statistics.median(timings):>10.2f}'
+                    f'{timings[int(len(timings) * 0.95) - 1]:>10.2f}'
+                    f'{statistics.mean(hits):>10.1f}'
+                )
+            transaction.set_rollback(True)
+
+    def vocabulary(self, rng, size):
+        words = set()
+        while len(words) < size:
+            words.add(''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+        return sorted(words, key=lambda word: rng.random())
+
+    def create_posts(self, rng, vocabulary, options):
+        author = User.objects.create(username='bench-search-author')
+        weights = list(itertools.accumulate(
+            1 / rank for rank in range(1, len(vocabulary) + 1)
+        ))
+        size = options['batch_size']
+        for start in range(0, options['posts'], size):
+            Post.objects.bulk_create(
+                Post(
+                    author=author,
+                    text=' '.join(rng.choices(
+                        vocabulary, cum_weights=weights, k=options['words']
+                    )),
+                )
+                for _ in range(min(size, options['posts'] - start))
+            )
+
+    def run(self, mode, queries):
+        factory = RequestFactory()
+        timings = []
+        hits = []
+        for query in queries:
+            started = time.perf_counter()
+            if mode == 'icontains':
+                # Так искала админка: первая страница по дате.
+                rows = list(
+                    Post.objects.filter(text__icontains=query)
+                    .order_by('-pub_date')[:10]
+                )
+            else:
+                page_obj = search.search_page(factory.get('/'), query)
+                if mode == 'fts-page2' and page_obj.has_next():
+                    page_obj = search.search_page(
+                        factory.get('/', {'after': page_obj.next_cursor}),
+                        query,
+                    )
+                rows = list(page_obj)
+            timings.append((time.perf_counter() - started) * 1000)
+            hits.append(len(rows))
+        return timings, hits
@@ -0,0 +1,104 @@
+import os
+import re
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post
+
+ROOT = 'posts'
+# posts/ab/ab12...ef.640w.webp — вариант для srcset (см. posts.images).
+VARIANT = re.compile(r'\.\d+w\.\w+$')
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки постов, на которые не ссылается ни один пост, '
+        'вместе с их вариантами и миниатюрами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд: их пост '
+                 'может быть ещё не сохранён.'
+        )
+
+    def handle(self, *args, **options):
+        self.storage = Post._meta.get_field('image').storage
+        blobs, stray = self.scan()
+        refs = Counter(
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True).iterator()
+        )
+        deadline = timezone.now() - timedelta(seconds=options['min_age'])
+        orphans = [
+            name for name in blobs
+            if not refs[name]
+            and self.storage.get_modified_time(name) < deadline
+        ]
+        self.stdout.write(
+            f'Файлов: {len(blobs)}, используется: '
+            f'{sum(1 for name in blobs if refs[name])}, общих: '
+            f'{sum(1 for name in blobs if refs[name] > 1)}, '
+            f'без ссылок: {len(orphans)}, '
+            f'вариантов без оригинала: {len(stray)}.'
+        )
+        if options['dry_run']:
+            return
+        removed = 0
+        size = options['batch_size']
+        for start in range(0, len(orphans), size):
+            removed += self.collect(orphans[start:start + size], blobs)
+        for name in stray:
+            self.storage.delete(name)
+        self.stdout.write(f'Удалено: {removed + len(stray)}.')
+
+    def scan(self):
+        """Оригиналы под posts/ с их вариантами и варианты без оригинала."""
+        blobs = {}
+        variants = {}
+        pending = [ROOT]
+        while pending:
+            directory = pending.pop()
+            if not self.storage.exists(directory):
+                continue
+            subdirectories, files = self.storage.listdir(directory)
+            pending.extend(
+                os.path.join(directory, name) for name in subdirectories
+            )
+            for name in files:
+                path = os.path.join(directory, name)
+                if VARIANT.search(path):
+                    stem = VARIANT.sub('', path)
+                    variants.setdefault(stem, []).append(path)
+                else:
+                    blobs[path] = os.path.splitext(path)[0]
+        blobs = {
+            name: variants.pop(stem, []) for name, stem in blobs.items()
+        }
+        return blobs, [name for names in variants.values() for name in names]
+
+    def collect(self, batch, blobs):
+        # Между подсчётом ссылок и удалением те же байты могли
+        # загрузить снова: перепроверяем каждую пачку.
+        alive = set(
+            Post.objects.filter(image__in=batch)
+            .values_list('image', flat=True)
+        )
+        removed = 0
+        for name in batch:
+            if name in alive:
+                continue
+            default.kvstore.delete(ImageFile(name, self.storage))
+            for variant in blobs[name]:
+                self.storage.delete(variant)
+            self.storage.delete(name)
+            removed += 1
+        return removed
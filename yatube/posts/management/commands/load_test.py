@@ -0,0 +1,279 @@
+import random
+import re
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+# Смесь маршрутов posts.urls по умолчанию: доля запросов каждого.
+MIX = {
+    'index': 40,
+    'post_detail': 20,
+    'profile': 10,
+    'group_list': 10,
+    'follow_index': 10,
+    'search': 5,
+    'autocomplete_users': 5,
+}
+# Для этих маршрутов нужен вошедший пользователь.
+LOGIN_REQUIRED = {'follow_index', 'post_create', 'add_comment'}
+# Эти маршруты отправляют форму: POST с CSRF-токеном.
+WRITES = {'post_create', 'add_comment'}
+# Ленты, по которым можно уйти вглубь по курсору.
+FEEDS = {'index', 'profile', 'group_list', 'follow_index'}
+WORDS = ('день', 'город', 'книга', 'море', 'работа', 'друг')
+# Ссылка «Следующая» курсорной пагинации ленты.
+NEXT_PAGE = re.compile(r'href="\?(after=[^"&]+)"')
+# Сколько найденных ссылок на следующие страницы помнить на ленту.
+CURSORS = 200
+
+
+def next_page(path, html):
+    """Адрес следующей страницы ленты по ссылке из её HTML."""
+    match = NEXT_PAGE.search(html)
+    return f'{path}?{match.group(1)}' if match else None
+
+
+def parse_mix(value):
+    """'index=50,post_detail=20' -> {'index': 50, 'post_detail': 20}."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        try:
+            mix[name.strip()] = int(weight or 1)
+        except ValueError:
+            raise CommandError(f'Неверный вес в --mix: {part}')
+    return mix
+
+
+def percentile(timings, share):
+    return timings[min(len(timings) - 1, int(len(timings) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер смесью маршрутов posts.urls и '
+        'выводит пропускную способность и задержки p50/p95/p99 по '
+        'каждому маршруту. Сессии пользователей создаются прямо в '
+        'базе, поэтому сервер должен работать с той же базой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument(
+            '--duration', type=float, default=None,
+            help='Секунд нагрузки; заменяет --requests.'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--mix', type=parse_mix, default=MIX,
+            help='Веса маршрутов: index=50,post_detail=20,...'
+        )
+        parser.add_argument(
+            '--users', type=int, default=20,
+            help='Сколько пользователей входят для закрытых страниц.'
+        )
+        parser.add_argument(
+            '--deep', type=float, default=0.2,
+            help='Доля запросов лент к следующим страницам: по ссылкам '
+                 '?after= из уже полученных страниц, как ходят клиенты.'
+        )
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        unknown = set(options['mix']) - set(MIX) - WRITES
+        if unknown:
+            raise CommandError(
+                f'Нет генератора адресов для: {", ".join(sorted(unknown))}'
+            )
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        self.lock = threading.Lock()
+        self.opener = urllib.request.build_opener(NoRedirect)
+        self.cursors = defaultdict(lambda: deque(maxlen=CURSORS))
+        # Свой CSRF-секрет: он же уходит в cookie и в X-CSRFToken.
+        self.csrf = get_random_string(32)
+        self.sample_data()
+        routes = list(options['mix'])
+        weights = [options['mix'][name] for name in routes]
+        plan = self.rng.choices(
+            routes, weights, k=options['requests']
+        ) if options['duration'] is None else None
+        results = defaultdict(list)
+        errors = defaultdict(int)
+        deadline = (
+            time.monotonic() + options['duration']
+            if options['duration'] is not None else None
+        )
+
+        def worker(index):
+            rng = random.Random(options['seed'] + index)
+            position = index
+            while True:
+                if plan is not None:
+                    if position >= len(plan):
+                        return
+                    name = plan[position]
+                    position += options['concurrency']
+                elif time.monotonic() >= deadline:
+                    return
+                else:
+                    name = rng.choices(routes, weights)[0]
+                elapsed, ok = self.fetch(name, rng)
+                with self.lock:
+                    results[name].append(elapsed)
+                    if not ok:
+                        errors[name] += 1
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            list(pool.map(worker, range(options['concurrency'])))
+        self.report(results, errors, time.monotonic() - started)
+
+    def sample_data(self):
+        """Выборка существующих id и имён, из которых строятся адреса."""
+        self.post_ids = list(
+            Post.objects.order_by('?').values_list('pk', flat=True)[:1000]
+        )
+        self.usernames = list(
+            User.objects.filter(posts__isnull=False).distinct()
+            .order_by('?').values_list('username', flat=True)[:1000]
+        )
+        self.slugs = list(
+            Group.objects.order_by('?').values_list('slug', flat=True)[:1000]
+        )
+        readers = User.objects.filter(
+            following__isnull=False, is_active=True
+        ).distinct().order_by('?')[:self.options['users']]
+        self.sessions = []
+        for user in readers:
+            client = Client()
+            client.force_login(user)
+            self.sessions.append(
+                client.cookies[settings.SESSION_COOKIE_NAME].value
+            )
+        needed = {
+            'post_detail': self.post_ids,
+            'add_comment': self.post_ids,
+            'profile': self.usernames,
+            'group_list': self.slugs,
+        }
+        for name in LOGIN_REQUIRED:
+            needed[name] = self.sessions
+        for name in self.options['mix']:
+            if name in needed and not needed[name]:
+                raise CommandError(
+                    f'Для {name} нет данных: заполните базу (seed_data).'
+                )
+
+    def path(self, name, rng):
+        if name in ('post_detail', 'add_comment'):
+            return reverse(name_of(name), args=[rng.choice(self.post_ids)])
+        if name in FEEDS and rng.random() < self.options['deep']:
+            with self.lock:
+                known = list(self.cursors[name])
+            if known:
+                return rng.choice(known)
+        if name == 'profile':
+            path = reverse(name_of(name), args=[rng.choice(self.usernames)])
+        elif name == 'group_list':
+            path = reverse(name_of(name), args=[rng.choice(self.slugs)])
+        elif name == 'search':
+            return reverse(name_of(name)) + '?' + urlencode(
+                {'q': rng.choice(WORDS)}
+            )
+        elif name == 'autocomplete_users':
+            return reverse(name_of(name)) + '?' + urlencode(
+                {'q': rng.choice(self.usernames)[:3]}
+            )
+        else:
+            path = reverse(name_of(name))
+        return path
+
+    def fetch(self, name, rng):
+        path = self.path(name, rng)
+        data = None
+        cookies = []
+        if name in LOGIN_REQUIRED:
+            cookies.append(
+                f'{settings.SESSION_COOKIE_NAME}={rng.choice(self.sessions)}'
+            )
+        if name in WRITES:
+            data = urlencode({'text': f'Нагрузка: {rng.choice(WORDS)}'})
+            cookies.append(f'{settings.CSRF_COOKIE_NAME}={self.csrf}')
+        request = urllib.request.Request(
+            self.options['url'].rstrip('/') + path,
+            data=data.encode() if data else None,
+        )
+        if cookies:
+            request.add_header('Cookie', '; '.join(cookies))
+        if name in WRITES:
+            request.add_header('X-CSRFToken', self.csrf)
+        started = time.perf_counter()
+        body = b''
+        try:
+            with self.opener.open(
+                request, timeout=self.options['timeout']
+            ) as response:
+                body = response.read()
+                ok = response.status < 400
+        except urllib.error.HTTPError as error:
+            # Формы отвечают редиректом: он успех, а не переход.
+            ok = error.code < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        elapsed = (time.perf_counter() - started) * 1000
+        if ok and name in FEEDS:
+            following = next_page(path.partition('?')[0], body.decode())
+            if following:
+                with self.lock:
+                    self.cursors[name].append(following)
+        return elapsed, ok
+
+    def report(self, results, errors, elapsed):
+        self.stdout.write(
+            f'{"route":<20}{"requests":>10}{"rps":>9}{"p50 ms":>9}'
+            f'{"p95 ms":>9}{"p99 ms":>9}{"errors":>8}'
+        )
+        for name in sorted(results, key=lambda name: -len(results[name])):
+            timings = sorted(results[name])
+            self.stdout.write(
+                f'{name:<20}{len(timings):>10}'
+                f'{len(timings) / elapsed:>9.1f}'
+                f'{statistics.median(timings):>9.1f}'
+                f'{percentile(timings, 0.95):>9.1f}'
+                f'{percentile(timings, 0.99):>9.1f}'
+                f'{errors[name]:>8}'
+            )
+        total = sum(len(timings) for timings in results.values())
+        failed = sum(errors.values())
+        self.stdout.write(
+            f'Всего: {total} запросов за {elapsed:.1f} с, '
+            f'{total / elapsed:.1f} запросов/с, ошибок: {failed}.'
+        )
+
+
+def name_of(route):
+    return f'posts:{route}'
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
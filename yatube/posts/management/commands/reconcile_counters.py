@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики постов, комментариев '
+        'и подписок и сообщает, сколько из них разошлись с таблицами.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать расхождения, ничего не исправляя.'
+        )
+
+    def handle(self, *args, **options):
+        report = counters.reconcile(fix=not options['dry_run'])
+        for counter, drift in report.items():
+            self.stdout.write(f'{counter}: {drift}')
+        total = sum(report.values())
+        if not total:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет.'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Расхождений: {total}.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено: {total}.'))
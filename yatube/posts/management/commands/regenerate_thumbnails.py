@@ -0,0 +1,160 @@
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Sum
+
+from core import metrics
+from posts import thumbnails
+from posts.models import Post
+
+CHECKPOINT = os.path.join(settings.BASE_DIR, '.regenerate_thumbnails.json')
+
+
+def regenerate(name, force=False):
+    """Создаёт миниатюры и варианты одного файла в процессе пула.
+
+    Возвращает (created, error): битый файл не прерывает прогон,
+    а попадает в отчёт и в yatube_thumbnails_total{result="error"}.
+    """
+    try:
+        if force:
+            thumbnails.forget(name)
+        return thumbnails.generate(name), None
+    except Exception as error:
+        return False, f'{type(error).__name__}: {error}'
+    finally:
+        # Процессы пула завершаются без atexit: досылаем сразу.
+        metrics.flush(force=True)
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт миниатюры всех размеров thumbnails.SIZES и варианты '
+        'для srcset для каждой картинки постов в пуле процессов. '
+        'Прогресс сохраняется, прерванный прогон продолжается с --resume.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Процессов в пуле; 0 — всё в текущем процессе.'
+        )
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать и уже готовые миниатюры.'
+        )
+        parser.add_argument('--resume', action='store_true')
+        parser.add_argument('--checkpoint', default=CHECKPOINT)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только оценить объём работы.'
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = self.load(options) if options['resume'] else {}
+        images = Post.objects.exclude(image='')
+        if checkpoint.get('last'):
+            images = images.filter(image__gt=checkpoint['last'])
+        if options['dry_run']:
+            return self.estimate(images, options)
+        done = checkpoint.get('done', 0)
+        created = 0
+        errors = 0
+        started = time.monotonic()
+        pool = self.pool(options['workers'])
+        try:
+            for batch in self.batches(images, options['batch_size']):
+                force = repeat(options['force'], len(batch))
+                results = (
+                    pool.map(regenerate, batch, force) if pool
+                    else map(regenerate, batch, force)
+                )
+                for name, (made, error) in zip(batch, results):
+                    created += made
+                    if error:
+                        errors += 1
+                        self.stderr.write(f'{name}: {error}')
+                done += len(batch)
+                self.save(options, {'last': batch[-1], 'done': done})
+                rate = done / max(time.monotonic() - started, 1e-6)
+                self.stdout.write(
+                    f'Обработано: {done}, создано: {created}, '
+                    f'ошибок: {errors}, '
+                    f'{rate:.1f} картинок/с'
+                )
+        finally:
+            if pool:
+                pool.shutdown()
+        if os.path.exists(options['checkpoint']):
+            os.remove(options['checkpoint'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done} картинок, создано для {created}.'
+        ))
+        if errors:
+            self.stdout.write(self.style.WARNING(
+                f'Картинок с ошибкой: {errors}, они перечислены выше.'
+            ))
+
+    def pool(self, workers):
+        if not workers:
+            return None
+        # Дочерние процессы открывают свои соединения с базой.
+        connections.close_all()
+        return ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('fork')
+        )
+
+    def batches(self, images, size):
+        """Имена картинок по возрастанию пачками, без загрузки всех."""
+        last = None
+        while True:
+            page = images.order_by('image')
+            if last is not None:
+                page = page.filter(image__gt=last)
+            batch = list(
+                page.values_list('image', flat=True).distinct()[:size]
+            )
+            if not batch:
+                return
+            yield batch
+            last = batch[-1]
+
+    def estimate(self, images, options):
+        count = 0
+        missing = 0
+        for batch in self.batches(images, options['batch_size']):
+            count += len(batch)
+            missing += (
+                len(batch) * len(thumbnails.SIZES) if options['force']
+                else thumbnails.missing(batch)
+            )
+        size = images.aggregate(total=Sum('image_size'))['total'] or 0
+        self.stdout.write(
+            f'Картинок: {count}, миниатюр создать: {missing}, '
+            f'оригиналов прочитать: не больше {size / 2 ** 20:.1f} МБ '
+            f'(без размера в базе: '
+            f'{images.filter(image_size__isnull=True).count()}).'
+        )
+
+    def load(self, options):
+        try:
+            with open(options['checkpoint']) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def save(self, options, state):
+        # Пишем во временный файл и переименовываем: прерывание
+        # посреди записи не испортит прежнюю точку продолжения.
+        temporary = options['checkpoint'] + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(state, file)
+        os.replace(temporary, options['checkpoint'])
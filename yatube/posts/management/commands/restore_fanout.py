@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts import feeds
+
+
+class Command(BaseCommand):
+    help = (
+        'Возвращает в push-режим авторов, у которых подписчиков стало '
+        'не больше POSTS_FANOUT_PUSH_LIMIT, и дополняет ленты их '
+        'подписчиков. Запускается по расписанию, вне запросов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        restored = feeds.restore_pushed(options['batch_size'])
+        for author_id, filled in restored:
+            self.stdout.write(f'Автор {author_id}: лент дополнено {filled}.')
+        self.stdout.write(
+            self.style.SUCCESS(f'Возвращено в push: {len(restored)}.')
+        )
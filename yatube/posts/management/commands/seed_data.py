@@ -0,0 +1,238 @@
+import itertools
+import random
+from collections import defaultdict
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker import Faker
+
+from posts import counters, feeds
+from posts.models import Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+PREFIX = 'seed'
+PASSWORD = 'seed-password'
+
+
+def zipf_weights(count, alpha):
+    """Накопленные веса закона Ципфа для random.choices(cum_weights=)."""
+    return list(itertools.accumulate(
+        1 / (rank + 1) ** alpha for rank in range(count)
+    ))
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу правдоподобными данными для нагрузочных '
+        'прогонов: пользователями, группами, постами, комментариями '
+        'и графом подписок со степенным распределением популярности. '
+        f'Пароль всех созданных пользователей — {PASSWORD}.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Подписок на одного пользователя.'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.1,
+            help='Показатель степенного закона популярности авторов.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней распределить даты постов.'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--locale', default='ru_RU')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.fake = Faker(options['locale'])
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            groups = self.create_groups(options['groups'])
+            # Популярные авторы и пишут больше, и читают их чаще.
+            weights = zipf_weights(len(users), options['alpha'])
+            posts = self.create_posts(users, groups, weights, options)
+            self.create_comments(users, posts, options['comments'])
+            follows = self.create_follows(users, weights, options['follows'])
+            # bulk_create не шлёт сигналов: счётчики и материализованные
+            # ленты подписок собираем сами.
+            counters.reconcile()
+            self.fill_timelines(users)
+        # Страницы лент и индексы автодополнения в кэше устарели.
+        cache.clear()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: пользователей {len(users)}, групп {len(groups)}, '
+            f'постов {len(posts)}, комментариев {options["comments"]}, '
+            f'подписок {follows}.'
+        ))
+
+    def bulk_create(self, model, objects):
+        """Создаёт объекты пачками и возвращает pk созданных по порядку.
+
+        bulk_create на SQLite не возвращает pk, но новые строки
+        получают возрастающие id, поэтому хватает границы до вставки.
+        """
+        last = model.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        for chunk in chunks(objects, self.batch_size):
+            model.objects.bulk_create(chunk)
+        return list(
+            model.objects.filter(pk__gt=last).order_by('pk')
+            .values_list('pk', flat=True)
+        )
+
+    def create_users(self, count):
+        start = User.objects.filter(
+            username__startswith=f'{PREFIX}-'
+        ).count()
+        password = make_password(PASSWORD)
+        users = []
+        for index in range(start, start + count):
+            first_name = self.fake.first_name()
+            last_name = self.fake.last_name()
+            users.append(User(
+                username=f'{PREFIX}-{index}',
+                first_name=first_name,
+                last_name=last_name,
+                email=f'{PREFIX}-{index}@example.com',
+                password=password,
+            ))
+        return self.bulk_create(User, users)
+
+    def create_groups(self, count):
+        start = Group.objects.filter(slug__startswith=f'{PREFIX}-').count()
+        return self.bulk_create(Group, (
+            Group(
+                title=self.fake.sentence(nb_words=3).rstrip('.'),
+                slug=f'{PREFIX}-{index}',
+                description=self.fake.paragraph(),
+            )
+            for index in range(start, start + count)
+        ))
+
+    def create_posts(self, users, groups, weights, options):
+        count = options['posts']
+        authors = self.rng.choices(users, cum_weights=weights, k=count)
+        post_ids = self.bulk_create(Post, (
+            Post(
+                author_id=author,
+                group_id=self.rng.choice(groups)
+                if groups and self.rng.random() < 0.5 else None,
+                text=self.fake.paragraph(nb_sentences=4),
+            )
+            for author in authors
+        ))
+        # pub_date заполняет auto_now_add, поэтому даты раскладываем
+        # отдельным проходом: от старых к новым в порядке id.
+        now = timezone.now()
+        step = timedelta(days=options['days']) / max(count, 1)
+        for chunk in chunks(enumerate(post_ids), self.batch_size):
+            Post.objects.bulk_update(
+                [
+                    Post(pk=pk, pub_date=now - step * (count - index))
+                    for index, pk in chunk
+                ],
+                ['pub_date'],
+            )
+        return post_ids
+
+    def create_comments(self, users, posts, count):
+        if not posts:
+            return
+        # Обсуждают тоже в основном свежие и популярные посты.
+        weights = zipf_weights(len(posts), 0.8)
+        recent_first = posts[::-1]
+        self.bulk_create(Comment, (
+            Comment(
+                post_id=post,
+                author_id=self.rng.choice(users),
+                text=self.fake.sentence(),
+            )
+            for post in self.rng.choices(
+                recent_first, cum_weights=weights, k=count
+            )
+        ))
+
+    def create_follows(self, users, weights, per_user):
+        per_user = min(per_user, len(users) - 1)
+        before = Follow.objects.count()
+
+        def pairs():
+            for user in users:
+                chosen = set()
+                while len(chosen) < per_user:
+                    chosen.update(
+                        author for author in self.rng.choices(
+                            users, cum_weights=weights,
+                            k=per_user - len(chosen),
+                        )
+                        if author != user
+                    )
+                yield from (
+                    Follow(user_id=user, author_id=author)
+                    for author in sorted(chosen)
+                )
+
+        for chunk in chunks(pairs(), self.batch_size):
+            Follow.objects.bulk_create(chunk, ignore_conflicts=True)
+        return Follow.objects.count() - before
+
+    def fill_timelines(self, users):
+        """Ленты подписок новых пользователей, как после feeds.backfill.
+
+        Посты каждого автора читаются один раз и раскладываются всем
+        его подписчикам большими пачками: по одной подписке, как при
+        обычном входе через сигналы, это в десятки раз дольше.
+        """
+        follows = Follow.objects.filter(
+            user__pk__range=(users[0], users[-1])
+        ) if users else Follow.objects.none()
+        readers = defaultdict(list)
+        for user_id, author_id in follows.values_list('user_id', 'author_id'):
+            readers[author_id].append(user_id)
+
+        def entries():
+            for author_id, user_ids in readers.items():
+                if feeds.is_pulled(author_id):
+                    continue
+                posts = Post.objects.filter(author_id=author_id).order_by(
+                    '-pub_date', '-pk'
+                ).values_list('pk', 'pub_date')[
+                    :feeds.timeline_backfill_size()
+                ]
+                for post_id, pub_date in posts:
+                    for user_id in user_ids:
+                        yield Timeline(
+                            user_id=user_id,
+                            post_id=post_id,
+                            author_id=author_id,
+                            pub_date=pub_date,
+                        )
+
+        for chunk in chunks(entries(), self.batch_size):
+            Timeline.objects.bulk_create(chunk, ignore_conflicts=True)
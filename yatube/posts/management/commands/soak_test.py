@@ -0,0 +1,215 @@
+import gc
+import random
+import tracemalloc
+from collections import defaultdict, deque
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from core import memory
+from posts.models import Group
+
+from .load_test import CURSORS, next_page
+
+User = get_user_model()
+
+ROUTES = ('index', 'group_list', 'profile', 'follow_index')
+MB = 1024 * 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Гоняет ленты через WSGI-обработчик Django в этом процессе и '
+        'проверяет, что память не растёт сверх --max-growth МБ после '
+        'прогрева. Прирост показывается по модулям (tracemalloc).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument(
+            '--warmup', type=int, default=500,
+            help='Запросов до первого замера: кэши успевают заполниться.'
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=5,
+            help='Замеров памяти за прогон.'
+        )
+        parser.add_argument(
+            '--max-growth', type=float, default=20,
+            help='Допустимый прирост памяти за прогон, МБ.'
+        )
+        parser.add_argument(
+            '--routes', default=','.join(ROUTES),
+            help=f'Через запятую, из: {", ".join(ROUTES)}.'
+        )
+        parser.add_argument(
+            '--deep', type=float, default=0.2,
+            help='Доля запросов к следующим страницам лент: по ссылкам '
+                 '?after= из уже полученных страниц, как ходят клиенты.'
+        )
+        parser.add_argument(
+            '--no-trace', action='store_true',
+            help='Без tracemalloc: быстрее, но только по RSS.'
+        )
+        parser.add_argument('--top', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        routes = [name.strip() for name in options['routes'].split(',')]
+        unknown = set(routes) - set(ROUTES)
+        if unknown:
+            raise CommandError(f'Неизвестные ленты: {", ".join(unknown)}')
+        self.rng = random.Random(options['seed'])
+        self.options = options
+        self.prepare(routes)
+        trace = not options['no_trace']
+        if trace:
+            memory.start()
+        try:
+            self.run(routes, options['warmup'])
+            base = self.measure(trace, pin=True)
+            self.report_round(0, base, base)
+            rounds = max(options['rounds'], 1)
+            step = max(options['requests'] // rounds, 1)
+            last = base
+            for number in range(1, rounds + 1):
+                self.run(routes, step)
+                last = self.measure(trace)
+                self.report_round(number, base, last)
+            growth = (last['memory'] - base['memory']) / MB
+            if trace:
+                self.report_modules(base['snapshot'], last['snapshot'])
+        finally:
+            if trace:
+                memory.stop()
+        if self.errors:
+            raise CommandError(f'Ответов с ошибкой: {self.errors}.')
+        if growth > options['max_growth']:
+            raise CommandError(
+                f'Память выросла на {growth:.1f} МБ, '
+                f'допустимо {options["max_growth"]:.1f} МБ.'
+            )
+        self.stdout.write(
+            f'Прирост памяти {growth:.1f} МБ в пределах '
+            f'{options["max_growth"]:.1f} МБ.'
+        )
+
+    def prepare(self, routes):
+        self.usernames = list(
+            User.objects.filter(posts__isnull=False).distinct()
+            .values_list('username', flat=True)[:200]
+        )
+        self.slugs = list(Group.objects.values_list('slug', flat=True)[:200])
+        # Запросы идут в WSGIHandler, как от сервера: тестовый Client
+        # на каждый запрос подключает сигналы и сам давал бы прирост.
+        self.handler = WSGIHandler()
+        self.cookie = None
+        reader = User.objects.filter(
+            following__isnull=False, is_active=True
+        ).first()
+        needed = {
+            'profile': self.usernames,
+            'group_list': self.slugs,
+            'follow_index': [reader] if reader else [],
+        }
+        for name in routes:
+            if name in needed and not needed[name]:
+                raise CommandError(
+                    f'Для {name} нет данных: заполните базу (seed_data).'
+                )
+        if reader is not None:
+            client = Client()
+            client.force_login(reader)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+            self.cookie = f'{settings.SESSION_COOKIE_NAME}={session}'
+        self.errors = 0
+        self.cursors = defaultdict(lambda: deque(maxlen=CURSORS))
+
+    def path(self, name):
+        if self.cursors[name] and self.rng.random() < self.options['deep']:
+            return self.rng.choice(self.cursors[name])
+        if name == 'profile':
+            path = reverse(f'posts:{name}',
+                           args=[self.rng.choice(self.usernames)])
+        elif name == 'group_list':
+            path = reverse(f'posts:{name}', args=[self.rng.choice(self.slugs)])
+        else:
+            path = reverse(f'posts:{name}')
+        return path
+
+    def get(self, path, cookie=None):
+        path, _, query = path.partition('?')
+        # Адрес не из INTERNAL_IPS: иначе debug_toolbar копил бы
+        # данные панелей и сам был бы источником роста.
+        environ = {
+            'PATH_INFO': path, 'QUERY_STRING': query,
+            'REMOTE_ADDR': '192.0.2.1',
+        }
+        if cookie:
+            environ['HTTP_COOKIE'] = cookie
+        setup_testing_defaults(environ)
+        statuses = []
+        response = self.handler(
+            environ, lambda status, headers: statuses.append(status)
+        )
+        try:
+            body = b''.join(response)
+        finally:
+            response.close()
+        return int(statuses[0].split()[0]), body
+
+    def run(self, routes, count):
+        for _ in range(count):
+            name = self.rng.choice(routes)
+            cookie = self.cookie if name == 'follow_index' else None
+            path = self.path(name)
+            status, body = self.get(path, cookie)
+            if status >= 400 and status != 404:
+                self.errors += 1
+            elif status == 200:
+                following = next_page(path.partition('?')[0], body.decode())
+                if following:
+                    self.cursors[name].append(following)
+
+    def measure(self, trace, pin=False):
+        gc.collect()
+        if not trace:
+            rss = memory.rss()
+            return {'rss': rss, 'memory': rss}
+        # Базу закрепляем: иначе при --rounds >= CORE_MEMORY_SNAPSHOTS
+        # её вытеснили бы снимки раундов.
+        number = memory.take(pin=pin)
+        return {
+            'rss': memory.rss(),
+            'memory': tracemalloc.get_traced_memory()[0],
+            'snapshot': number,
+        }
+
+    def report_round(self, number, base, current):
+        self.stdout.write(
+            f'Замер {number}: RSS {current["rss"] / MB:.1f} МБ '
+            f'({(current["rss"] - base["rss"]) / MB:+.1f}), '
+            f'отслежено {current["memory"] / MB:.1f} МБ '
+            f'({(current["memory"] - base["memory"]) / MB:+.1f})'
+        )
+
+    def report_modules(self, base, last):
+        report = memory.report(last, base, limit=self.options['top'])
+        self.stdout.write('Прирост по модулям:')
+        for entry in report['modules']:
+            self.stdout.write(
+                f'  {entry["module"]:<40}'
+                f'{entry["size_diff"] / 1024:>+12.1f} КБ'
+                f'{entry["count_diff"]:>+10} объектов'
+            )
+        self.stdout.write('Прирост по строкам:')
+        for entry in report['sites']:
+            self.stdout.write(
+                f'  {entry["site"]:<70}'
+                f'{entry["size_diff"] / 1024:>+12.1f} КБ'
+            )
@@ -0,0 +1,101 @@
+from django.db import migrations
+
+# Полнотекстовый индекс постов: rowid — id поста, text — его текст,
+# comments — тексты всех его комментариев. Триггеры держат индекс
+# в согласии с posts_post и posts_comment при любых записях,
+# включая bulk_create и update() мимо сигналов.
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE posts_search USING fts5(
+        text, comments, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_search (rowid, text, comments)
+        VALUES (new.id, new.text, '');
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text
+    ON posts_post WHEN old.text IS NOT new.text
+    BEGIN
+        UPDATE posts_search SET text = new.text WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_insert AFTER INSERT
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET comments = (
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = new.post_id
+        ) WHERE rowid = new.post_id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_update AFTER UPDATE OF text, post_id
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET comments = coalesce((
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = posts_search.rowid
+        ), '') WHERE rowid IN (old.post_id, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET comments = coalesce((
+            SELECT group_concat(text, ' ') FROM posts_comment
+            WHERE post_id = old.post_id
+        ), '') WHERE rowid = old.post_id;
+    END
+    """,
+    """
+    INSERT INTO posts_search (rowid, text, comments)
+    SELECT id, text, coalesce((
+        SELECT group_concat(text, ' ') FROM posts_comment
+        WHERE post_id = posts_post.id
+    ), '') FROM posts_post
+    """,
+]
+DROP = [
+    'DROP TRIGGER IF EXISTS posts_search_comment_delete',
+    'DROP TRIGGER IF EXISTS posts_search_comment_update',
+    'DROP TRIGGER IF EXISTS posts_search_comment_insert',
+    'DROP TRIGGER IF EXISTS posts_search_post_delete',
+    'DROP TRIGGER IF EXISTS posts_search_post_update',
+    'DROP TRIGGER IF EXISTS posts_search_post_insert',
+    'DROP TABLE IF EXISTS posts_search',
+]
+
+
+def execute(statements):
+    def run(apps, schema_editor):
+        # FTS5 есть только у SQLite; на других базах поиск
+        # откатывается на icontains (см. posts.search).
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.RunPython(execute(SCHEMA), execute(DROP)),
+    ]
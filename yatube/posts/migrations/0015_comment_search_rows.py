@@ -0,0 +1,96 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Имена триггеров и таблицы те же, поэтому DROP из 0014 годится
+# в обе стороны, а откат восстанавливает прежнюю схему.
+previous = import_module('posts.migrations.0014_post_search')
+
+# Комментарии индексируются построчно: у поста строка с rowid = id
+# поста, у каждого комментария — своя, с rowid = -id комментария,
+# и столбец post_id связывает её с постом. Запись комментария
+# меняет одну строку индекса, а не пересобирает все комментарии поста.
+SCHEMA = [
+    """
+    CREATE VIRTUAL TABLE posts_search USING fts5(
+        text, comments, post_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_search_post_insert AFTER INSERT ON posts_post
+    BEGIN
+        INSERT INTO posts_search (rowid, text, comments, post_id)
+        VALUES (new.id, new.text, '', new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_update AFTER UPDATE OF text
+    ON posts_post WHEN old.text IS NOT new.text
+    BEGIN
+        UPDATE posts_search SET text = new.text WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_post_delete AFTER DELETE ON posts_post
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_insert AFTER INSERT
+    ON posts_comment
+    BEGIN
+        INSERT INTO posts_search (rowid, text, comments, post_id)
+        VALUES (-new.id, '', new.text, new.post_id);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_update AFTER UPDATE OF text, post_id
+    ON posts_comment
+    BEGIN
+        UPDATE posts_search SET comments = new.text, post_id = new.post_id
+        WHERE rowid = -old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_search_comment_delete AFTER DELETE
+    ON posts_comment
+    BEGIN
+        DELETE FROM posts_search WHERE rowid = -old.id;
+    END
+    """,
+    """
+    INSERT INTO posts_search (rowid, text, comments, post_id)
+    SELECT id, text, '', id FROM posts_post
+    """,
+    """
+    INSERT INTO posts_search (rowid, text, comments, post_id)
+    SELECT -id, '', text, post_id FROM posts_comment
+    """,
+]
+
+
+def execute(*statement_lists):
+    def run(apps, schema_editor):
+        # FTS5 есть только у SQLite (см. 0014_post_search).
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statements in statement_lists:
+            for statement in statements:
+                schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            execute(previous.DROP, SCHEMA),
+            execute(previous.DROP, previous.SCHEMA),
+        ),
+    ]
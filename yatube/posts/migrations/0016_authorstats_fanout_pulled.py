@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled(apps, schema_editor):
+    # Авторы выше порога уже читаются через pull: запоминаем это,
+    # чтобы вернуть их в push только через restore_fanout.
+    limit = getattr(settings, 'POSTS_FANOUT_FOLLOWER_LIMIT', 1000)
+    if limit is None:
+        return
+    AuthorStats = apps.get_model('posts', 'AuthorStats')
+    AuthorStats.objects.filter(followers_count__gt=limit).update(
+        fanout_pulled=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_search_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='authorstats',
+            name='fanout_pulled',
+            field=models.BooleanField(default=False, help_text='Снимается командой restore_fanout, когда подписчиков становится не больше POSTS_FANOUT_PUSH_LIMIT.', verbose_name='Посты читаются при запросе ленты'),
+        ),
+        migrations.RunPython(mark_pulled, migrations.RunPython.noop),
+    ]
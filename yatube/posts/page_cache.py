@@ -0,0 +1,143 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.views.decorators.http import condition
+
+from .single_flight import single_flight
+
+VERSION_PREFIX = 'feed-version'
+PAGE_PREFIX = 'feed-page'
+
+
+def feed_timeout():
+    """Сколько живёт страница ленты, если её никто не инвалидировал."""
+    return getattr(settings, 'POSTS_FEED_CACHE_TIMEOUT', 60 * 60)
+
+
+def version_key(scope):
+    return f'{VERSION_PREFIX}:{scope}'
+
+
+def _fresh_version():
+    # Начальное значение уникально во времени: если ключ версии
+    # вытеснили из кэша, старые страницы не оживут под тем же номером.
+    return time.time_ns()
+
+
+def get_versions(scopes):
+    """Текущие поколения областей ленты; недостающие заводятся заново."""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def request_versions(request, scopes):
+    """get_versions() с запоминанием на время запроса: ETag и кэш
+    страницы читают поколения одних и тех же областей."""
+    memo = request.__dict__.setdefault('_feed_versions', {})
+    key = tuple(scopes)
+    if key not in memo:
+        memo[key] = tuple(get_versions(scopes))
+    return memo[key]
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def bump(*scopes):
+    """Делает устаревшими все страницы указанных областей.
+
+    Поколение сдвигается сразу и ещё раз после фиксации транзакции:
+    иначе страницу, собранную до коммита по старым данным, могли бы
+    сохранить уже под новым поколением.
+    """
+    _bump(scopes)
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def page_key(request, scopes):
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{PAGE_PREFIX}:{",".join(scopes)}:{viewer}:{path}'
+
+
+def feed_grace():
+    """Сколько после устаревания страницу ещё можно отдать, пока
+    другой запрос пересобирает её."""
+    return getattr(settings, 'POSTS_FEED_CACHE_GRACE', 5 * 60)
+
+
+def cache_feed(*scopes):
+    """Кэширует GET-ответ ленты до смены поколения её областей.
+
+    scopes — шаблоны областей, подставляемые из аргументов URL,
+    например 'group:{slug}'. Версия страницы — поколения всех её
+    областей: запись в любую из них делает страницу устаревшей.
+    Пересобирает её один запрос, остальные тем временем получают
+    прежнюю версию (см. single_flight.fetch).
+    """
+    def key_func(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return page_key(
+            request, [scope.format(**kwargs) for scope in scopes]
+        )
+
+    def version_func(request, *args, **kwargs):
+        return request_versions(
+            request, [scope.format(**kwargs) for scope in scopes]
+        )
+
+    return single_flight(
+        key_func, version_func, timeout=feed_timeout, grace=feed_grace
+    )
+
+
+def page_etag(request, scopes):
+    """ETag страницы: поколения её областей, зритель и адрес.
+
+    Адрес включает курсор или номер страницы, зритель — потому что
+    страницы вошедших пользователей отличаются от анонимных.
+    """
+    viewer = request.user.pk if request.user.is_authenticated else 'anon'
+    state = repr((
+        request_versions(request, scopes), viewer, request.get_full_path()
+    ))
+    return hashlib.md5(state.encode()).hexdigest()
+
+
+def conditional_page(*scopes):
+    """Отвечает 304 Not Modified, пока области страницы не менялись.
+
+    scopes — шаблоны областей, как у cache_feed, или функции
+    (**kwargs URL) -> список областей; если функция вернула None,
+    ETag не считается и ответ собирает само представление.
+    Проверка стоит поколений из кэша: ни запроса страницы,
+    ни отрисовки шаблона. Ставится над cache_feed.
+    """
+    def etag_func(request, *args, **kwargs):
+        names = []
+        for scope in scopes:
+            if callable(scope):
+                found = scope(**kwargs)
+                if found is None:
+                    return None
+                names.extend(found)
+            else:
+                names.append(scope.format(**kwargs))
+        return page_etag(request, names)
+
+    return condition(etag_func=etag_func)
@@ -0,0 +1,117 @@
+import re
+
+from django.db import connection, models
+
+from . import utils
+from .models import Post
+
+TABLE = 'posts_search'
+# Вес совпадения в тексте поста и в комментарии для bm25; post_id
+# не индексируется. Строка поста — rowid = id, строка комментария —
+# rowid = -id комментария (см. миграцию 0015_comment_search_rows).
+WEIGHTS = (2.0, 1.0, 0.0)
+WORD = re.compile(r'\w+')
+MAX_TERMS = 8
+
+
+def available():
+    """Есть ли FTS5-индекс: он создаётся миграцией только на SQLite."""
+    return connection.vendor == 'sqlite'
+
+
+def match_expression(query, column=None):
+    """Запрос пользователя -> выражение FTS5 MATCH.
+
+    Слова берутся в кавычки, чтобы операторы FTS5 в запросе
+    не разбирались, и объединяются через AND; последнее слово
+    ищется как префикс. column ограничивает поиск одним столбцом.
+    Пустая строка — в запросе нет ни одного слова.
+    """
+    terms = WORD.findall(query)[:MAX_TERMS]
+    if not terms:
+        return ''
+    phrases = [f'"{term}"' for term in terms]
+    phrases[-1] += '*'
+    expression = ' '.join(phrases)
+    if column:
+        expression = f'{column} : ({expression})'
+    return expression
+
+
+def matching_ids(query, column=None):
+    """Подзапрос с id постов, подходящих под query, для pk__in."""
+    return models.expressions.RawSQL(
+        f'SELECT post_id FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [match_expression(query, column)],
+    )
+
+
+class SearchPaginator(utils.CursorPaginator):
+    """Курсорная пагинация результатов поиска по релевантности.
+
+    Ключ страницы — (score, id), где score — сумма -bm25 по строкам
+    поста и его комментариев, подошедшим под запрос: чем больше, тем
+    ближе пост к запросу. Совпадения считает FTS5, а посты страницы
+    дочитываются одним запросом с select_related.
+    """
+
+    def __init__(self, object_list, per_page, query):
+        super().__init__(object_list, per_page, keys=('search_score', 'pk'))
+        self.expression = match_expression(query)
+
+    def key_fields(self):
+        return [models.FloatField(), models.IntegerField()]
+
+    def fetch(self, values, reverse):
+        if not self.expression:
+            return []
+        if reverse:
+            order, condition = 'ASC', 'score > %s OR score = %s AND id > %s'
+        else:
+            order, condition = 'DESC', 'score < %s OR score = %s AND id < %s'
+        params = [self.expression]
+        where = ''
+        if values is not None:
+            score, pk = values
+            where = f'WHERE {condition}'
+            params += [score, score, pk]
+        sql = (
+            f'SELECT id, score FROM ('
+            f'SELECT post_id AS id, sum(score) AS score FROM ('
+            f'SELECT post_id, -bm25({TABLE}, %s, %s, %s) AS score '
+            # LIMIT -1 не даёт SQLite развернуть подзапрос в GROUP BY:
+            # bm25 работает только в запросе с самим MATCH.
+            f'FROM {TABLE} WHERE {TABLE} MATCH %s LIMIT -1'
+            f') GROUP BY post_id'
+            f') {where} ORDER BY score {order}, id {order} LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [*WEIGHTS, *params, self.per_page + 1]
+            )
+            scores = dict(cursor.fetchall())
+        posts = self.object_list.in_bulk(list(scores))
+        rows = []
+        for pk, score in scores.items():
+            if pk in posts:
+                posts[pk].search_score = score
+                rows.append(posts[pk])
+        return rows
+
+
+def search_page(request, query):
+    """Страница результатов поиска query, лучшие совпадения первыми.
+
+    Без FTS5 ищет icontains по тексту постов в порядке ленты.
+    """
+    post_list = Post.objects.select_related('author', 'group')
+    if not available():
+        return utils.paginator(
+            request,
+            post_list.filter(text__icontains=query) if query.strip()
+            else post_list.none(),
+        )
+    return SearchPaginator(post_list, utils.ORDER, query).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
@@ -0,0 +1,155 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import autocomplete, counters, feeds, page_cache
+from .models import Comment, Follow, Group, Post, User
+
+
+def post_scopes(post, *group_ids):
+    """Области кэша лент, на страницах которых виден пост,
+    и область страницы самого поста."""
+    scopes = ['index', f'post:{post.pk}']
+    scopes.extend(
+        f'profile:{username}' for username in User.objects.filter(
+            pk=post.author_id
+        ).values_list('username', flat=True)
+    )
+    group_ids = {post.group_id, *group_ids} - {None}
+    if group_ids:
+        scopes.extend(
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk__in=group_ids
+            ).values_list('slug', flat=True)
+        )
+    return scopes
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._saved_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    saved_group_id = getattr(instance, '_saved_group_id', None)
+    if created:
+        counters.post_added(instance)
+        feeds.fan_out(instance)
+    elif hasattr(instance, '_saved_group_id'):
+        counters.post_moved(saved_group_id, instance.group_id)
+        del instance._saved_group_id
+    page_cache.bump(*post_scopes(instance, saved_group_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.post_removed(instance)
+    page_cache.bump(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_post(instance.post_id, 1)
+    page_cache.bump(*post_scopes(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        page_cache.bump(*post_scopes(post))
+
+
+def group_scopes(group, slug):
+    """Области кэша со ссылками на группу: её лента под прежним slug,
+    главная и страницы авторов и самих постов группы."""
+    scopes = ['index', f'group:{slug}']
+    posts = Post.objects.filter(group_id=group.pk)
+    scopes.extend(
+        f'profile:{username}' for username in User.objects.filter(
+            pk__in=posts.values('author_id')
+        ).values_list('username', flat=True)
+    )
+    scopes.extend(
+        f'post:{pk}' for pk in posts.values_list('pk', flat=True)
+    )
+    return scopes
+
+
+@receiver(pre_save, sender=Group)
+def group_saving(sender, instance, **kwargs):
+    if not instance._state.adding:
+        instance._saved_slug = Group.objects.filter(
+            pk=instance.pk
+        ).values_list('slug', flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    scopes = [f'group:{instance.slug}']
+    saved_slug = getattr(instance, '_saved_slug', None)
+    if saved_slug is not None:
+        # Название и slug видны на страницах всех постов группы.
+        scopes.extend(group_scopes(instance, saved_slug))
+        del instance._saved_slug
+    page_cache.bump(*scopes)
+    autocomplete.groups.invalidate()
+
+
+@receiver(pre_delete, sender=Group)
+def group_deleting(sender, instance, **kwargs):
+    # После удаления Post.group обнуляется UPDATE без сигналов Post:
+    # посты группы нужно найти, пока они ещё на неё ссылаются.
+    instance._deleted_scopes = group_scopes(instance, instance.slug)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    page_cache.bump(*getattr(instance, '_deleted_scopes', ()))
+    autocomplete.groups.invalidate()
+
+
+# Поля пользователя, которые попадают в индекс автодополнения.
+USER_INDEX_FIELDS = {'username', 'first_name', 'last_name', 'is_active'}
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Вход в систему сохраняет только last_login: индекс не трогаем.
+    if update_fields is None or USER_INDEX_FIELDS & set(update_fields):
+        autocomplete.users.invalidate()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    autocomplete.users.invalidate()
+
+
+def follow_scopes(follow):
+    return [
+        f'profile:{username}' for username in User.objects.filter(
+            pk__in=[follow.user_id, follow.author_id]
+        ).values_list('username', flat=True)
+    ]
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.follow_added(instance)
+        feeds.follow_added(instance.user_id, instance.author_id)
+    page_cache.bump(*follow_scopes(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    feeds.follow_removed(instance.user_id, instance.author_id)
+    page_cache.bump(*follow_scopes(instance))
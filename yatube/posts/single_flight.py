@@ -0,0 +1,122 @@
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import metrics
+
+LOCK_PREFIX = 'single-flight-lock'
+METRIC = 'yatube_single_flight_total'
+EVENTS = ('hits', 'stale', 'recomputes', 'waits')
+POLL_INTERVAL = 0.05
+
+
+def lock_timeout():
+    """Сколько секунд пересчёт может держать блокировку."""
+    return getattr(settings, 'POSTS_SINGLE_FLIGHT_LOCK_TIMEOUT', 10)
+
+
+def wait_timeout():
+    """Сколько секунд ждать чужой пересчёт, если отдать нечего."""
+    return getattr(settings, 'POSTS_SINGLE_FLIGHT_WAIT', 2.0)
+
+
+def _labels(name, event):
+    return (('view', name), ('event', event))
+
+
+def record(name, event):
+    # Счётчик процесса в core.metrics, а не incr в общем кэше:
+    # запись в кэш брала бы блокировку на каждое попадание.
+    metrics.inc(METRIC, _labels(name, event))
+
+
+def stats(name):
+    """Счётчики попаданий, устаревших ответов и пересчётов для name
+    по всем процессам хоста."""
+    return {
+        event: int(metrics.value(METRIC, _labels(name, event)))
+        for event in EVENTS
+    }
+
+
+def _wait_for(key, version):
+    deadline = time.monotonic() + wait_timeout()
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == version:
+            return entry
+    return None
+
+
+def fetch(key, compute, version=None, timeout=60, grace=60,
+          name='default', cacheable=None):
+    """Значение из кэша с защитой от «стада» при его пересчёте.
+
+    Запись хранит (version, fresh_until, value). Пока она свежа и её
+    версия совпадает с version, это попадание. Когда запись устарела
+    или версия сменилась, пересчитывает только тот, кто взял
+    блокировку, а остальные в это время получают старое значение.
+    Если отдать нечего, ждём чужой пересчёт не дольше wait_timeout(),
+    а потом считаем сами. Запись живёт timeout + grace секунд:
+    grace — окно, в котором ещё можно отдать устаревшее значение.
+    """
+    entry = cache.get(key)
+    lock_key = f'{LOCK_PREFIX}:{key}'
+    if entry is not None:
+        entry_version, fresh_until, value = entry
+        if entry_version == version and time.time() < fresh_until:
+            record(name, 'hits')
+            return value
+    locked = cache.add(lock_key, 1, lock_timeout())
+    if not locked:
+        if entry is not None:
+            record(name, 'stale')
+            return entry[2]
+        entry = _wait_for(key, version)
+        if entry is not None:
+            record(name, 'waits')
+            return entry[2]
+    try:
+        value = compute()
+        record(name, 'recomputes')
+        if cacheable is None or cacheable(value):
+            cache.set(
+                key, (version, time.time() + timeout, value), timeout + grace
+            )
+    finally:
+        if locked:
+            cache.delete(lock_key)
+    return value
+
+
+def single_flight(key_func, version_func=None, timeout=60, grace=60):
+    """Декоратор представления поверх fetch().
+
+    key_func(request, *args, **kwargs) возвращает ключ ответа или None,
+    если ответ не кэшируется; version_func — его текущую версию.
+    Кэшируются только ответы со статусом 200.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            key = key_func(request, *args, **kwargs)
+            if key is None:
+                return view(request, *args, **kwargs)
+            version = (
+                version_func(request, *args, **kwargs)
+                if version_func else None
+            )
+            return fetch(
+                key,
+                lambda: view(request, *args, **kwargs),
+                version=version,
+                timeout=timeout() if callable(timeout) else timeout,
+                grace=grace() if callable(grace) else grace,
+                name=view.__name__,
+                cacheable=lambda response: response.status_code == 200,
+            )
+        return wrapper
+    return decorator
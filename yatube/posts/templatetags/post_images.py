@@ -0,0 +1,51 @@
+from django import template
+from django.utils.html import format_html
+
+from posts import images
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(post, fallback, css_class='card-img my-2', lazy=True):
+    """<img> картинки поста с srcset по готовым вариантам.
+
+    fallback — миниатюра кадра ленты из {% thumbnail %}: её адрес
+    уходит в src для браузеров без srcset и для постов, варианты
+    которых ещё не готовы. Размеры заданы явно (images.display_size
+    по размерам из базы), чтобы браузер
+    резервировал место под картинку до её загрузки, а заглушка
+    post.image_placeholder видна в этом месте фоном, пока картинка
+    грузится. lazy=False — для картинки, которая сразу на экране.
+    """
+    width, height = images.display_size(post, fallback)
+    attrs = format_html(
+        'class="{}" width="{}" height="{}" decoding="async"',
+        css_class, width, height,
+    )
+    if lazy:
+        attrs = format_html('{} loading="lazy"', attrs)
+    if post.image_placeholder:
+        attrs = format_html(
+            '{} style="background: center / cover url({})"',
+            attrs, post.image_placeholder,
+        )
+    if not post.image_variants:
+        return format_html('<img src="{}" {}>', fallback.url, attrs)
+    name = post.image.name
+    widths = images.useful_widths(
+        post, [int(width) for width in post.image_variants.split(',')]
+    )
+    formats = images.variant_formats(name)
+    original = formats[0][0]
+    webp = ''
+    if any(extension == images.WEBP for extension, *_ in formats):
+        webp = format_html(
+            '<source type="image/webp" srcset="{}" sizes="{}">',
+            images.srcset(name, widths, images.WEBP), images.SIZES,
+        )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        webp, fallback.url, images.srcset(name, widths, original),
+        images.SIZES, attrs,
+    )
@@ -0,0 +1,91 @@
+from django import forms
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import autocomplete
+from ..models import Group
+
+User = get_user_model()
+
+
+class AutocompleteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='leo', first_name='Лев', last_name='Толстой'
+        )
+        User.objects.create_user(username='leonid')
+        User.objects.create_user(username='anna', is_active=False)
+        cls.group = Group.objects.create(
+            title='Ёжики в тумане', slug='hedgehogs', description='-'
+        )
+        Group.objects.create(title='Кошки', slug='cats', description='-')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def results(self, name, query):
+        response = self.client.get(reverse(f'posts:{name}'), {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_groups_by_title_and_slug(self):
+        """Группы ищутся по началу названия и slug без учёта регистра."""
+        for query in ('ежик', 'ЁЖ', 'hedge'):
+            with self.subTest(query=query):
+                self.assertEqual(self.results('autocomplete_groups', query), [
+                    {'id': self.group.pk, 'title': 'Ёжики в тумане',
+                     'slug': 'hedgehogs'},
+                ])
+        self.assertEqual(self.results('autocomplete_groups', ''), [])
+
+    def test_users_by_username_and_name(self):
+        """Пользователи ищутся по логину, имени и фамилии."""
+        found = self.results('autocomplete_users', 'leo')
+        self.assertEqual(
+            [user['username'] for user in found], ['leo', 'leonid']
+        )
+        self.assertEqual(self.results('autocomplete_users', 'толс'), [{
+            'username': 'leo',
+            'full_name': 'Лев Толстой',
+            'url': reverse('posts:profile', args=['leo']),
+        }])
+        self.assertEqual(self.results('autocomplete_users', 'ann'), [])
+
+    def test_index_refreshed_on_change(self):
+        """Индекс пересобирается после правок и не ходит в базу без них."""
+        self.results('autocomplete_groups', 'к')
+        with CaptureQueriesContext(connection) as queries:
+            self.results('autocomplete_groups', 'к')
+        self.assertEqual(len(queries.captured_queries), 0)
+        Group.objects.create(title='Котики', slug='kittens', description='-')
+        self.assertEqual(
+            [group['title'] for group in self.results(
+                'autocomplete_groups', 'кот'
+            )],
+            ['Котики'],
+        )
+        self.client.force_login(self.user)
+        version = autocomplete.users.current_version()
+        self.client.force_login(self.user)
+        self.assertEqual(autocomplete.users.current_version(), version)
+
+    def test_post_form_does_not_list_groups(self):
+        """Форма поста не выводит все группы, а подсказывает их."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('posts:post_create'))
+        form = response.context['form']
+        self.assertIsInstance(form.fields['group'], forms.ModelChoiceField)
+        self.assertNotContains(response, '<select')
+        self.assertContains(response, 'js/autocomplete.js')
+        self.assertContains(response, reverse('posts:autocomplete_groups'))
+        self.assertFalse(any(
+            'posts_group' in query['sql']
+            for query in queries.captured_queries
+        ))
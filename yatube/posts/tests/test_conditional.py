@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.get(pk=self.post.pk)
+        self.group = Group.objects.get(pk=self.group.pk)
+        self.urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_not_modified(self):
+        """Без изменений страница отвечает 304 без SQL и шаблонов."""
+        for url in self.urls[:3]:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                with self.assertNumQueries(0):
+                    response = self.revalidate(url, etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+        url = self.urls[3]
+        etag = self.client.get(url)['ETag']
+        # Для страницы поста — только имя автора.
+        with self.assertNumQueries(1):
+            response = self.revalidate(url, etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_etag(self):
+        etags = {url: self.client.get(url)['ETag'] for url in self.urls}
+        Post.objects.create(author=self.author, group=self.group, text='Ещё')
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_comment_changes_post_etag(self):
+        url = self.urls[3]
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author, text='Да')
+        self.assertEqual(self.revalidate(url, etag).status_code, 200)
+
+    def test_group_change_changes_etags(self):
+        """Правка и удаление группы меняют ETag страниц с её постами."""
+        old_group = self.urls[1]
+        urls = [self.urls[0], self.urls[2], self.urls[3]]
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        self.group.slug = 'renamed'
+        self.group.save()
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = self.revalidate(url, etag)
+                self.assertContains(response, '/group/renamed/')
+        self.assertEqual(self.client.get(old_group).status_code, 404)
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        self.group.delete()
+        for url, etag in etags.items():
+            with self.subTest(url=url, deleted=True):
+                response = self.revalidate(url, etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, 'renamed')
+
+    def test_viewer_and_page_in_etag(self):
+        """Другой зритель или другая страница — другой ETag."""
+        url = self.urls[0]
+        anonymous = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'],
+                            anonymous)
+        self.client.force_login(self.author)
+        self.assertEqual(self.revalidate(url, anonymous).status_code, 200)
+
+    def test_missing_post(self):
+        response = self.client.get(reverse('posts:post_detail', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
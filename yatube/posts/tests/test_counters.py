@@ -0,0 +1,136 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import views
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group_1 = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.group_2 = Group.objects.create(
+            title='Тестовая группа_2',
+            slug='test-slug_2',
+            description='Тестовое описание_2',
+        )
+
+    def stats(self, user):
+        return AuthorStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Создание, перенос и удаление поста меняют счётчики."""
+        post = Post.objects.create(
+            author=self.author,
+            group=self.group_1,
+            text='Тестовый пост',
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group_1.refresh_from_db()
+        self.assertEqual(self.group_1.posts_count, 1)
+        post.group = self.group_2
+        post.save()
+        self.group_1.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.group_1.posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 1)
+        post.delete()
+        self.group_2.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.group_2.posts_count, 0)
+
+    def test_comment_counter(self):
+        """Комментарии считаются на посте."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        comment = Comment.objects.create(
+            post=post,
+            author=self.reader,
+            text='Комментарий',
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_edit_keeps_comment_counter(self):
+        """Комментарий, добавленный во время правки поста, не теряется
+        из счётчика: правка не пишет comments_count."""
+        post = Post.objects.create(author=self.author, text='Тестовый пост')
+        self.client.force_login(self.author)
+        original = views.get_object_or_404
+
+        def get_then_comment(*args, **kwargs):
+            found = original(*args, **kwargs)
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий'
+            )
+            return found
+
+        with mock.patch.object(
+            views, 'get_object_or_404', side_effect=get_then_comment
+        ):
+            self.client.post(
+                reverse('posts:post_edit', args=[post.pk]),
+                {'text': 'Новый текст'},
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Новый текст')
+        self.assertEqual(post.comments_count, 1)
+
+    def test_follow_counters(self):
+        """Подписка и отписка меняют счётчики обеих сторон."""
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_user_delete_with_counters(self):
+        """Удаление пользователя не спотыкается о его счётчики."""
+        Post.objects.create(author=self.author, text='Тестовый пост')
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author.delete()
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertFalse(AuthorStats.objects.filter(
+            user_id=self.author.pk
+        ).exists())
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        """reconcile_counters находит и исправляет расхождения."""
+        post = Post.objects.create(
+            author=self.author,
+            group=self.group_1,
+            text='Тестовый пост',
+        )
+        Post.objects.filter(pk=post.pk).update(comments_count=5)
+        Group.objects.filter(pk=self.group_1.pk).update(posts_count=0)
+        AuthorStats.objects.filter(user=self.author).update(posts_count=9)
+        out = StringIO()
+        call_command('reconcile_counters', '--dry-run', stdout=out)
+        self.assertIn('Расхождений: 3.', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 5)
+        call_command('reconcile_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.group_1.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.group_1.posts_count, 1)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('Расхождений нет.', out.getvalue())
@@ -1,11 +1,14 @@
+import hashlib
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
 from ..forms import PostForm
 from ..models import Post
@@ -66,13 +69,10 @@ class PostFormTests(TestCase):
         # Проверяем, увеличилось ли число постов
         self.assertEqual(Post.objects.count(), posts_count + 1)
         # Проверяем, что создалась запись с заданным id
-        self.assertTrue(
-            Post.objects.filter(
-                text='Тестовый пост',
-                pk=1,
-                image='posts/small.gif',
-            ).exists()
-        )
+        post = Post.objects.get(text='Тестовый пост', pk=1)
+        # Имя файла — SHA-256 сохранённого содержимого
+        digest = post.image_hash
+        self.assertEqual(post.image.name, f'posts/{digest[:2]}/{digest}.gif')
 
     def test_edit_post(self):
         Post.objects.create(
@@ -98,6 +98,41 @@ class PostFormTests(TestCase):
         )
         self.assertEqual(post_changed.text, 'Тестовый пост изменился')
 
+    @override_settings(POSTS_IMAGE_MAX_SIDE=2048)
+    def test_upload_normalized(self):
+        """Загрузка поворачивается по EXIF, уменьшается и теряет EXIF."""
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        buffer = BytesIO()
+        Image.new('RGB', (3000, 1000), 'red').save(
+            buffer, 'JPEG', exif=exif
+        )
+        self.authorized_client.post(reverse('posts:post_create'), {
+            'text': 'Фото с камеры',
+            'image': SimpleUploadedFile(
+                name='camera.jpg',
+                content=buffer.getvalue(),
+                content_type='image/jpeg'
+            ),
+        })
+        post = Post.objects.get(text='Фото с камеры')
+        with post.image.open() as file:
+            content = file.read()
+        stored = Image.open(BytesIO(content))
+        self.assertEqual(stored.size, (683, 2048))
+        self.assertEqual(dict(stored.getexif()), {})
+        self.assertEqual(
+            (post.image_width, post.image_height), stored.size
+        )
+        self.assertEqual(post.image_size, len(content))
+        self.assertEqual(
+            post.image_hash, hashlib.sha256(content).hexdigest()
+        )
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/png;base64,')
+        )
+        self.assertLess(len(post.image_placeholder), 1000)
+
 
 class CommentFormTests(TestCase):
     @classmethod
@@ -0,0 +1,145 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images
+from ..models import Post
+from ..templatetags.post_images import responsive_image
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(name, size=(1200, 800), image_format='PNG'):
+    buffer = BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, image_format)
+    return SimpleUploadedFile(
+        name=name,
+        content=buffer.getvalue(),
+        content_type=f'image/{image_format.lower()}'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageVariantsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=make_image('picture.png'),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.get(pk=self.post.pk)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_make_variants(self):
+        """Варианты всех ширин лежат рядом с оригиналом в кадре ленты."""
+        name = self.post.image.name
+        images.make_variants(name)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, '320,640,960')
+        for extension, *_ in images.variant_formats(name):
+            for width in images.WIDTHS:
+                variant = images.variant_name(name, width, extension)
+                self.assertTrue(variant.startswith('posts/'))
+                with default_storage.open(variant) as file:
+                    size = Image.open(file).size
+                self.assertEqual(size, (width, round(339 * width / 960)))
+
+    def test_srcset_rendered(self):
+        """Лента отдаёт srcset, sizes и явные размеры картинки."""
+        images.make_variants(self.post.image.name)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, f'sizes="{images.SIZES}"')
+        self.assertContains(response, images.srcset(
+            self.post.image.name, images.WIDTHS, 'png'
+        ))
+        if images.webp_supported():
+            self.assertContains(response, 'type="image/webp"')
+
+    def test_no_variants_yet(self):
+        """Без вариантов остаётся обычная картинка с размерами."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertNotContains(response, 'srcset')
+
+    def test_edit_resets_variants(self):
+        """Замена картинки сбрасывает варианты прежней."""
+        Post.objects.filter(pk=self.post.pk).update(
+            image_variants='320,640,960'
+        )
+        self.client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            {'text': 'Новый текст', 'image': make_image('other.png')},
+        )
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.image_variants, '')
+        self.assertIn(self.post.image_hash, self.post.image.name)
+
+    def test_metadata_backfill(self):
+        """backfill_image_metadata заполняет поля картинки, лента
+        выводит заглушку."""
+        self.assertEqual(self.post.image_placeholder, '')
+        self.assertIsNone(self.post.image_width)
+        out = StringIO()
+        call_command('backfill_image_metadata', stdout=out)
+        self.assertIn('Заполнено постов: 1, ошибок: 0.', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (1200, 800)
+        )
+        self.assertIn(self.post.image_hash, self.post.image.name)
+        self.assertEqual(self.post.image_size, self.post.image.size)
+        placeholder = self.post.image_placeholder
+        self.assertTrue(placeholder.startswith('data:image/png;base64,'))
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'url({placeholder})')
+        self.assertContains(response, 'loading="lazy"')
+        response = self.client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        self.assertContains(response, f'url({placeholder})')
+        self.assertNotContains(response, 'loading="lazy"')
+
+    def test_original_fallback_keeps_proportions(self):
+        """Пока миниатюры нет, у оригинала его пропорции из базы."""
+        self.post.image_width, self.post.image_height = 1200, 800
+        html = responsive_image(self.post, self.post.image)
+        self.assertIn('width="960" height="640"', html)
+        self.post.image_width = None
+        html = responsive_image(self.post, self.post.image)
+        self.assertIn('width="960" height="339"', html)
+
+    def test_srcset_without_upscaled_variants(self):
+        """Варианты шире оригинала не попадают в srcset."""
+        name = self.post.image.name
+        images.make_variants(name)
+        Post.objects.filter(pk=self.post.pk).update(
+            image_width=500, image_height=500
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, images.srcset(name, (320, 640), 'png')
+        )
+        self.assertNotContains(response, images.variant_name(name, 960, 'png'))
@@ -0,0 +1,161 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters, feeds
+from ..management.commands import soak_test
+from ..management.commands.load_test import next_page
+from ..models import Comment, Follow, Group, Post, Timeline
+
+User = get_user_model()
+
+
+def seed(**options):
+    options = {
+        'users': 30, 'groups': 3, 'posts': 200, 'comments': 100,
+        'follows': 5, **options,
+    }
+    call_command(
+        'seed_data', *(f'--{name}={value}' for name, value in options.items()),
+        stdout=StringIO(),
+    )
+
+
+class SeedDataTests(TestCase):
+    def test_seed_volumes_and_consistency(self):
+        """seed_data создаёт заданные объёмы и согласованные счётчики."""
+        seed()
+        self.assertEqual(User.objects.count(), 30)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertEqual(Follow.objects.count(), 30 * 5)
+        self.assertFalse(any(counters.reconcile(fix=False).values()))
+        dates = list(Post.objects.values_list('pub_date', flat=True))
+        self.assertEqual(len(set(dates)), 200)
+        user = Follow.objects.first().user
+        expected = set(Timeline.objects.filter(
+            user=user
+        ).values_list('post_id', flat=True))
+        feeds.rebuild_timeline(user.pk)
+        self.assertEqual(
+            set(Timeline.objects.filter(
+                user=user
+            ).values_list('post_id', flat=True)),
+            expected,
+        )
+        self.assertTrue(self.client.login(
+            username=user.username, password='seed-password'
+        ))
+
+    def test_follow_graph_is_skewed(self):
+        """Подписчики распределены по степенному закону, а не поровну."""
+        seed(users=100, posts=10, comments=0, follows=10)
+        followers = sorted(
+            User.objects.filter(following__isnull=False).distinct()
+            .values_list('stats__followers_count', flat=True),
+            reverse=True,
+        )
+        self.assertGreater(followers[0], 5 * followers[len(followers) // 2])
+
+    def test_seed_twice(self):
+        """Повторный запуск добавляет данные, не конфликтуя с прежними."""
+        seed(users=5, posts=5, comments=5, follows=2)
+        seed(users=5, posts=5, comments=5, follows=2)
+        self.assertEqual(User.objects.count(), 10)
+
+
+class LoadTestCommandTests(LiveServerTestCase):
+    def setUp(self):
+        cache.clear()
+        seed(users=10, posts=30, comments=10, follows=3)
+
+    def test_report_per_route(self):
+        """load_test нагружает маршруты и выводит задержки по каждому."""
+        out = StringIO()
+        call_command(
+            'load_test', f'--url={self.live_server_url}', '--requests=40',
+            '--concurrency=2', '--users=2', stdout=out,
+        )
+        report = out.getvalue()
+        for route in ('index', 'post_detail', 'follow_index'):
+            self.assertIn(route, report)
+        self.assertIn('p99 ms', report)
+        self.assertIn('Всего: 40 запросов', report)
+        self.assertIn('ошибок: 0.', report)
+
+    def test_writes_and_cursor_pages(self):
+        """Формы отправляются с CSRF, глубокие страницы — по курсору."""
+        comments = Comment.objects.count()
+        posts = Post.objects.count()
+        out = StringIO()
+        call_command(
+            'load_test', f'--url={self.live_server_url}', '--requests=30',
+            '--concurrency=1', '--users=2', '--deep=1',
+            '--mix=add_comment=1,post_create=1,index=1', stdout=out,
+        )
+        self.assertIn('ошибок: 0.', out.getvalue())
+        self.assertGreater(Comment.objects.count(), comments)
+        self.assertGreater(Post.objects.count(), posts)
+
+    def test_next_page_link(self):
+        html = self.client.get(reverse('posts:index')).content.decode()
+        following = next_page('/', html)
+        self.assertRegex(following, r'^/\?after=')
+        self.assertEqual(self.client.get(following).status_code, 200)
+
+
+class SoakTestCommandTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        seed(users=10, posts=30, comments=10, follows=3)
+
+    def test_bounded_growth(self):
+        """soak_test гоняет ленты и показывает прирост по модулям."""
+        out = StringIO()
+        call_command(
+            'soak_test', '--requests=40', '--warmup=10', '--rounds=2',
+            '--max-growth=50', stdout=out,
+        )
+        report = out.getvalue()
+        self.assertIn('Замер 2:', report)
+        self.assertIn('Прирост по модулям:', report)
+        self.assertIn('в пределах 50.0 МБ', report)
+
+    @override_settings(CORE_MEMORY_SNAPSHOTS=2)
+    def test_more_rounds_than_snapshots(self):
+        """База не вытесняется, даже если раундов больше, чем снимков."""
+        out = StringIO()
+        call_command(
+            'soak_test', '--requests=20', '--warmup=5', '--rounds=3',
+            '--max-growth=50', stdout=out,
+        )
+        self.assertIn('Замер 3:', out.getvalue())
+        self.assertIn('в пределах 50.0 МБ', out.getvalue())
+
+    def test_deep_follows_cursor_links(self):
+        """Следующие страницы берутся по ссылкам ?after=, а не ?page=N."""
+        get = soak_test.Command.get
+        with mock.patch.object(
+            soak_test.Command, 'get', autospec=True, side_effect=get
+        ) as spy:
+            call_command(
+                'soak_test', '--requests=30', '--warmup=10', '--rounds=1',
+                '--no-trace', '--deep=0.5', '--max-growth=1000',
+                '--routes=index', stdout=StringIO(),
+            )
+        paths = [call.args[1] for call in spy.call_args_list]
+        self.assertTrue(any('?after=' in path for path in paths))
+        self.assertFalse(any('page=' in path for path in paths))
+
+    def test_growth_limit(self):
+        with self.assertRaisesMessage(CommandError, 'Память выросла'):
+            call_command(
+                'soak_test', '--requests=20', '--warmup=5', '--rounds=1',
+                '--no-trace', '--max-growth=-1000', stdout=StringIO(),
+            )
@@ -0,0 +1,132 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import urls
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Предельное число SQL-запросов на страницу для каждого имени из
+# posts.urls. Страница ленты выводит ORDER постов, так что N+1 по
+# авторам, группам или комментариям сразу выходит за бюджет.
+QUERY_BUDGETS = {
+    'index': 3,
+    'group_list': 4,
+    'profile': 5,
+    'post_detail': 5,
+    'post_create': 3,
+    'post_edit': 4,
+    'add_comment': 7,
+    'search': 5,
+    'autocomplete_groups': 1,
+    'autocomplete_users': 1,
+    'follow_index': 4,
+    'profile_follow': 15,
+    'profile_unfollow': 11,
+}
+
+
+class QueryBudgetTests(TestCase):
+    """Каждая страница укладывается в свой бюджет запросов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.other = User.objects.create_user(username='other')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+        for i in range(5):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'commenter_{i}'),
+                text=f'Комментарий {i}',
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.other_client = Client()
+        self.other_client.force_login(self.other)
+
+    def requests(self):
+        post_id = {'post_id': self.post.pk}
+        return {
+            'index': (self.reader_client, 'get', reverse('posts:index')),
+            'group_list': (self.reader_client, 'get', reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            )),
+            'profile': (self.reader_client, 'get', reverse(
+                'posts:profile', kwargs={'username': 'author'}
+            )),
+            'post_detail': (self.reader_client, 'get', reverse(
+                'posts:post_detail', kwargs=post_id
+            )),
+            'post_create': (self.author_client, 'get', reverse(
+                'posts:post_create'
+            )),
+            'post_edit': (self.author_client, 'get', reverse(
+                'posts:post_edit', kwargs=post_id
+            )),
+            'add_comment': (self.reader_client, 'post', reverse(
+                'posts:add_comment', kwargs=post_id
+            )),
+            'search': (self.reader_client, 'get', reverse(
+                'posts:search'
+            ) + '?q=пост'),
+            'autocomplete_groups': (self.reader_client, 'get', reverse(
+                'posts:autocomplete_groups'
+            ) + '?q=тест'),
+            'autocomplete_users': (self.reader_client, 'get', reverse(
+                'posts:autocomplete_users'
+            ) + '?q=auth'),
+            'follow_index': (self.reader_client, 'get', reverse(
+                'posts:follow_index'
+            )),
+            'profile_follow': (self.other_client, 'get', reverse(
+                'posts:profile_follow', kwargs={'username': 'author'}
+            )),
+            'profile_unfollow': (self.reader_client, 'get', reverse(
+                'posts:profile_unfollow', kwargs={'username': 'author'}
+            )),
+        }
+
+    def test_every_url_has_budget(self):
+        """У каждого маршрута posts.urls объявлен бюджет запросов."""
+        names = {pattern.name for pattern in urls.urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_views_within_budget(self):
+        """Страницы не выходят за бюджет запросов из QUERY_BUDGETS."""
+        for name, (client, method, url) in self.requests().items():
+            data = {'text': 'Комментарий'} if method == 'post' else None
+            with self.subTest(name=name):
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, method)(url, data)
+                self.assertLess(response.status_code, 400)
+                used = len(queries.captured_queries)
+                self.assertLessEqual(
+                    used,
+                    QUERY_BUDGETS[name],
+                    f'{name}: {used} запросов при бюджете '
+                    f'{QUERY_BUDGETS[name]}:\n' + '\n'.join(
+                        query['sql'] for query in queries.captured_queries
+                    )
+                )
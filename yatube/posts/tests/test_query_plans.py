@@ -0,0 +1,102 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Полный просмотр таблицы без индекса. «SCAN ... USING INDEX» —
+# это проход по индексу в нужном порядке с LIMIT, он допустим.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+class QueryPlanTests(TestCase):
+    """Запросы страниц не делают полных просмотров и сортировок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+        for i in range(3):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.reader,
+                text=f'Комментарий {i}',
+            )
+        cls.reader_client = Client()
+        cls.reader_client.force_login(cls.reader)
+
+    def setUp(self):
+        cache.clear()
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_plans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.reader_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if not sql.upper().startswith('SELECT'):
+                continue
+            for step in self.explain(sql):
+                with self.subTest(url=url, sql=sql, step=step):
+                    self.assertIsNone(FULL_SCAN.match(step))
+                    self.assertNotIn(TEMP_SORT, step)
+        return response
+
+    def feed_urls(self):
+        return [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:follow_index'),
+        ]
+
+    def test_feed_first_pages(self):
+        """Первые страницы лент идут по индексам."""
+        for url in self.feed_urls():
+            self.assert_plans(url)
+
+    def test_feed_cursor_pages(self):
+        """Страницы после курсора ищут начало по индексу."""
+        for url in self.feed_urls():
+            response = self.assert_plans(url)
+            cursor = response.context['page_obj'].next_cursor
+            self.assert_plans(f'{url}?after={cursor}')
+            self.assert_plans(f'{url}?before={cursor}')
+
+    @override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=0)
+    def test_pulled_follow_feed(self):
+        """Pull-часть ленты подписок читает потоки авторов по индексу."""
+        response = self.assert_plans(reverse('posts:follow_index'))
+        cursor = response.context['page_obj'].next_cursor
+        self.assert_plans(reverse('posts:follow_index') + f'?after={cursor}')
+
+    def test_post_detail(self):
+        """Комментарии поста читаются по индексу (post, created)."""
+        self.assert_plans(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class RegenerateThumbnailsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='author')
+        cls.names = []
+        for index in range(5):
+            post = Post.objects.create(
+                author=user,
+                text=f'Пост {index}',
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=small_gif + bytes([index]),
+                    content_type='image/gif'
+                ),
+            )
+            cls.names.append(post.image.name)
+        cls.names.sort()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.checkpoint = os.path.join(TEMP_MEDIA_ROOT, 'checkpoint.json')
+
+    def regenerate(self, *args):
+        out = StringIO()
+        call_command(
+            'regenerate_thumbnails', '--workers=0', '--batch-size=2',
+            f'--checkpoint={self.checkpoint}', *args, stdout=out
+        )
+        return out.getvalue()
+
+    def test_dry_run_estimates_work(self):
+        """--dry-run считает картинки и недостающие миниатюры."""
+        out = self.regenerate('--dry-run')
+        self.assertIn(
+            f'Картинок: 5, миниатюр создать: {5 * len(thumbnails.SIZES)}',
+            out
+        )
+        self.assertEqual(thumbnails.missing(self.names), 5)
+
+    def test_regenerate_all(self):
+        """Команда создаёт всё недостающее и убирает точку продолжения."""
+        out = self.regenerate()
+        self.assertIn('Готово: 5 картинок, создано для 5.', out)
+        self.assertIn('картинок/с', out)
+        self.assertEqual(thumbnails.missing(self.names), 0)
+        self.assertFalse(os.path.exists(self.checkpoint))
+        self.assertIn('миниатюр создать: 0', self.regenerate('--dry-run'))
+
+    def test_resume_from_checkpoint(self):
+        """--resume пропускает картинки до сохранённой точки."""
+        with open(self.checkpoint, 'w') as file:
+            json.dump({'last': self.names[2], 'done': 3}, file)
+        out = self.regenerate('--resume')
+        self.assertIn('Готово: 5 картинок, создано для 2.', out)
+        self.assertEqual(thumbnails.missing(self.names[:3]), 3)
+        self.assertEqual(thumbnails.missing(self.names[3:]), 0)
+
+    def test_force(self):
+        """--force пересоздаёт уже готовые миниатюры."""
+        self.regenerate()
+        out = self.regenerate('--force')
+        self.assertIn('создано для 5.', out)
+
+    def test_broken_image_does_not_stop_run(self):
+        """Битая картинка попадает в ошибки, остальные обрабатываются."""
+        post = Post.objects.create(
+            author=User.objects.get(username='author'),
+            text='Битая картинка',
+            image=SimpleUploadedFile(
+                name='broken.gif', content=b'not an image',
+                content_type='image/gif'
+            ),
+        )
+        err = StringIO()
+        out = StringIO()
+        call_command(
+            'regenerate_thumbnails', '--workers=0', '--batch-size=2',
+            f'--checkpoint={self.checkpoint}', stdout=out, stderr=err
+        )
+        self.assertIn('Готово: 6 картинок, создано для 5.', out.getvalue())
+        self.assertIn('Картинок с ошибкой: 1', out.getvalue())
+        self.assertIn(post.image.name, err.getvalue())
+        self.assertEqual(thumbnails.missing(self.names), 0)
+        self.assertFalse(os.path.exists(self.checkpoint))
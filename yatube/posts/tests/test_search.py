@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Comment, Post
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.in_text = Post.objects.create(
+            author=cls.user, text='Рыжий кот спит на подоконнике'
+        )
+        cls.in_comment = Post.objects.create(
+            author=cls.user, text='Фото дня'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.in_comment, author=cls.user, text='Какой пушистый кот!'
+        )
+        for index in range(12):
+            Post.objects.create(author=cls.user, text=f'Заметка номер {index}')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.in_text = Post.objects.get(pk=self.in_text.pk)
+        self.comment = Comment.objects.get(pk=self.comment.pk)
+
+    def found(self, query, **params):
+        response = self.client.get(
+            reverse('posts:search'), {'q': query, **params}
+        )
+        self.assertEqual(response.status_code, 200)
+        return response, [post.pk for post in response.context['page_obj']]
+
+    def test_ranked_by_text_and_comments(self):
+        """Совпадение в тексте поста выше совпадения в комментарии."""
+        _, found = self.found('кот')
+        self.assertEqual(found, [self.in_text.pk, self.in_comment.pk])
+        _, found = self.found('КОТ подоконн')
+        self.assertEqual(found, [self.in_text.pk])
+
+    def test_index_follows_writes(self):
+        """Триггеры обновляют индекс при правке и удалении."""
+        self.in_text.text = 'Рыжая собака'
+        self.in_text.save()
+        self.comment.delete()
+        _, found = self.found('кот')
+        self.assertEqual(found, [])
+        _, found = self.found('собака')
+        self.assertEqual(found, [self.in_text.pk])
+        self.in_text.delete()
+        _, found = self.found('собака')
+        self.assertEqual(found, [])
+
+    def test_comment_rows(self):
+        """Каждый комментарий — своя строка индекса, очки поста
+        складываются по всем подошедшим строкам."""
+        other = Post.objects.create(author=self.user, text='Фото ночи')
+        for text in ('Кот!', 'Второй кот'):
+            Comment.objects.create(post=other, author=self.user, text=text)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT count(*) FROM {search.TABLE} WHERE post_id = %s',
+                [other.pk],
+            )
+            self.assertEqual(cursor.fetchone()[0], 3)
+        _, found = self.found('кот')
+        self.assertLess(found.index(other.pk), found.index(self.in_comment.pk))
+        self.comment.text = 'Какой пушистый пёс!'
+        self.comment.save()
+        _, found = self.found('кот')
+        self.assertEqual(set(found), {self.in_text.pk, other.pk})
+
+    def test_keyset_pagination(self):
+        """Страницы результатов идут по курсору без повторов."""
+        response, first = self.found('заметка')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(first), 10)
+        self.assertContains(response, 'q=%D0%B7%D0%B0%D0%BC%D0%B5%D1%82')
+        response, second = self.found('заметка', after=page_obj.next_cursor)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        _, previous = self.found(
+            'заметка', before=response.context['page_obj'].previous_cursor
+        )
+        self.assertEqual(previous, first)
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 в запросе не ломают поиск."""
+        for query in ('', '"', 'кот AND', 'NEAR(кот', '* OR -'):
+            with self.subTest(query=query):
+                self.found(query)
+        self.assertEqual(
+            search.match_expression('кот AND "пёс'), '"кот" "AND" "пёс"*'
+        )
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке ищет по индексу текста постов."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кот'}
+        )
+        self.assertEqual(
+            [post.pk for post in response.context['cl'].result_list],
+            [self.in_text.pk],
+        )
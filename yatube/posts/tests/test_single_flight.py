@@ -0,0 +1,76 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import metrics
+
+from .. import single_flight
+from ..models import Post, User
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def fetch(self, version=1, **kwargs):
+        return single_flight.fetch(
+            'key', self.compute, version=version, name='test', **kwargs
+        )
+
+    def test_hit_after_recompute(self):
+        """Свежая запись отдаётся без пересчёта."""
+        self.assertEqual(self.fetch(), 'value 1')
+        # Попадание ничего не пишет в общий кэш.
+        with mock.patch.object(cache, 'incr') as incr:
+            self.assertEqual(self.fetch(), 'value 1')
+        incr.assert_not_called()
+        self.assertEqual(
+            single_flight.stats('test'),
+            {'hits': 1, 'stale': 0, 'recomputes': 1, 'waits': 0}
+        )
+
+    def test_new_version_recomputes(self):
+        """Смена версии пересчитывает значение, если блокировка свободна."""
+        self.fetch(version=1)
+        self.assertEqual(self.fetch(version=2), 'value 2')
+
+    def test_stale_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдаётся прежнее значение."""
+        self.fetch(version=1)
+        cache.add(f'{single_flight.LOCK_PREFIX}:key', 1)
+        self.assertEqual(self.fetch(version=2), 'value 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(single_flight.stats('test')['stale'], 1)
+
+    def test_expired_entry_is_stale(self):
+        """Истёкшая по времени запись тоже считается устаревшей."""
+        self.fetch(timeout=0)
+        cache.add(f'{single_flight.LOCK_PREFIX}:key', 1)
+        self.assertEqual(self.fetch(), 'value 1')
+        cache.delete(f'{single_flight.LOCK_PREFIX}:key')
+        self.assertEqual(self.fetch(), 'value 2')
+
+    @override_settings(POSTS_SINGLE_FLIGHT_WAIT=0.1)
+    def test_cold_miss_computes_after_wait(self):
+        """Без записи и при чужой блокировке значение считается после
+        ожидания, а не теряется."""
+        cache.add(f'{single_flight.LOCK_PREFIX}:key', 1)
+        self.assertEqual(self.fetch(), 'value 1')
+
+    def test_feed_view_metrics(self):
+        """Декоратор ленты считает попадания и пересчёты по имени view."""
+        user = User.objects.create_user(username='author')
+        Post.objects.create(author=user, text='Тестовый пост')
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+        stats = single_flight.stats('index')
+        self.assertEqual(stats['recomputes'], 1)
+        self.assertEqual(stats['hits'], 1)
@@ -0,0 +1,95 @@
+import hashlib
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from .. import images, thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedStorageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.storage = Post._meta.get_field('image').storage
+
+    def create_post(self, name='small.gif', content=small_gif):
+        return Post.objects.create(
+            author=self.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name=name,
+                content=content,
+                content_type='image/gif'
+            ),
+        )
+
+    def test_same_bytes_share_file(self):
+        """Одинаковые байты хранятся одним файлом под своим хешем."""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.GIF')
+        digest = hashlib.sha256(small_gif).hexdigest()
+        self.assertEqual(first.image.name, f'posts/{digest[:2]}/{digest}.gif')
+        self.assertEqual(second.image.name, first.image.name)
+        _, files = self.storage.listdir(f'posts/{digest[:2]}')
+        originals = [name for name in files if name.count('.') == 1]
+        self.assertEqual(originals, [f'{digest}.gif'])
+
+    def test_reupload_reuses_variants(self):
+        """Повторная загрузка берёт готовые варианты, а не пересчитывает."""
+        first = self.create_post()
+        thumbnails.generate(first.image.name)
+        second = self.create_post()
+        with mock.patch.object(images, 'make_variants') as make_variants:
+            thumbnails.generate(second.image.name)
+        make_variants.assert_not_called()
+        second.refresh_from_db()
+        self.assertEqual(second.image_variants, '320,640,960')
+
+    def test_gc_media(self):
+        """gc_media удаляет файлы без ссылок вместе с вариантами."""
+        kept = self.create_post()
+        orphan = self.create_post('orphan.gif', small_gif + b'\x00')
+        images.make_variants(orphan.image.name)
+        orphan_name = orphan.image.name
+        variant = images.variant_name(orphan_name, 320, 'gif')
+        orphan.delete()
+        out = StringIO()
+        call_command('gc_media', '--dry-run', '--min-age=0', stdout=out)
+        self.assertIn('без ссылок: 1', out.getvalue())
+        self.assertTrue(self.storage.exists(orphan_name))
+        call_command('gc_media', '--min-age=0', stdout=StringIO())
+        self.assertFalse(self.storage.exists(orphan_name))
+        self.assertFalse(self.storage.exists(variant))
+        self.assertTrue(self.storage.exists(kept.image.name))
+        out = StringIO()
+        call_command('gc_media', stdout=out)
+        self.assertIn('без ссылок: 0', out.getvalue())
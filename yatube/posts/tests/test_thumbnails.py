@@ -0,0 +1,197 @@
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+small_gif = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+THUMBNAIL_TAG = re.compile(r'{% thumbnail \S+ "([^"]+)" (.*?) as \w+ %}')
+
+
+def parse_options(options):
+    parsed = {}
+    for option in options.split():
+        key, value = option.split('=')
+        parsed[key] = {'True': True, 'False': False}.get(
+            value, value.strip('"')
+        )
+    return parsed
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_templates_use_known_sizes(self):
+        """Шаблоны запрашивают только размеры из thumbnails.SIZES."""
+        templates = Path(settings.BASE_DIR, 'templates')
+        used = set()
+        for template in templates.rglob('*.html'):
+            for geometry, options in THUMBNAIL_TAG.findall(
+                template.read_text()
+            ):
+                used.add((geometry, tuple(parse_options(options).items())))
+        self.assertTrue(used)
+        self.assertEqual(used, {
+            (geometry, tuple(options.items()))
+            for geometry, options in thumbnails.SIZES
+        })
+
+    def test_render_does_not_generate(self):
+        """Без готовой миниатюры страница получает оригинал."""
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        self.assertNotContains(
+            response, settings.MEDIA_URL + sorl_settings.THUMBNAIL_PREFIX
+        )
+
+    def test_generate_all_sizes(self):
+        """generate создаёт миниатюры, и страница их читает."""
+        self.assertTrue(thumbnails.generate(self.post.image.name))
+        self.assertFalse(thumbnails.generate(self.post.image.name))
+        geometry, options = thumbnails.SIZES[0]
+        thumbnail = get_thumbnail(self.post.image, geometry, **options)
+        self.assertNotEqual(thumbnail.url, self.post.image.url)
+        self.assertTrue(Path(TEMP_MEDIA_ROOT, thumbnail.name).exists())
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_create_schedules_generation(self):
+        """post_create ставит загруженное изображение в очередь."""
+        client = Client()
+        client.force_login(self.user)
+        with mock.patch.object(thumbnails, 'schedule') as schedule:
+            client.post(reverse('posts:post_create'), {
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    name='other.gif',
+                    content=small_gif,
+                    content_type='image/gif'
+                ),
+            })
+        schedule.assert_called_once_with(
+            Post.objects.get(text='Пост с картинкой').image.name
+        )
+
+    def kvstore_queries(self, queries):
+        return [
+            query for query in queries.captured_queries
+            if 'thumbnail_kvstore' in query['sql']
+        ]
+
+    def test_prefetch_batches_lookups(self):
+        """Миниатюры страницы достаются одним запросом, тёплые — без базы."""
+        for index in range(3):
+            post = Post.objects.create(
+                author=self.user,
+                text=f'Пост {index}',
+                image=SimpleUploadedFile(
+                    name=f'page_{index}.gif',
+                    content=small_gif,
+                    content_type='image/gif'
+                ),
+            )
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        with mock.patch.object(
+            type(default.kvstore._wrapped), '_get_raw',
+            side_effect=AssertionError('поштучный запрос к KV'),
+        ):
+            with CaptureQueriesContext(connection) as cold:
+                response = Client().get(reverse('posts:index'))
+            with CaptureQueriesContext(connection) as warm:
+                Client().get(reverse('posts:index') + '?warm')
+        self.assertEqual(len(self.kvstore_queries(cold)), 1)
+        self.assertEqual(self.kvstore_queries(warm), [])
+        geometry, options = thumbnails.SIZES[0]
+        thumbnail = get_thumbnail(post.image, geometry, **options)
+        self.assertContains(response, thumbnail.url)
+
+    def test_cache_kvstore(self):
+        """CacheKVStore хранит метаданные миниатюр только в кэше."""
+        with mock.patch.object(default, 'kvstore', thumbnails.CacheKVStore()):
+            self.assertTrue(thumbnails.generate(self.post.image.name))
+            post = Post.objects.get(pk=self.post.pk)
+            with self.assertNumQueries(0):
+                thumbnails.prefetch([post])
+        self.assertEqual(len(post.image.thumbnails), len(thumbnails.SIZES))
+        self.assertTrue(all(post.image.thumbnails.values()))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKER=True)
+class ThumbnailWorkerTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_worker_generates_in_background(self):
+        """Фоновый поток создаёт миниатюры поставленного файла."""
+        cache.clear()
+        post = Post.objects.create(
+            author=User.objects.create_user(username='author'),
+            text='Тестовый пост',
+            image=SimpleUploadedFile(
+                name='worker.gif',
+                content=small_gif,
+                content_type='image/gif'
+            ),
+        )
+        thumbnails.enqueue(post.image.name)
+        thumbnails.wait()
+        self.assertFalse(thumbnails.generate(post.image.name))
+
+    def test_worker_survives_failed_cleanup(self):
+        """Сбой уборки после задачи не вешает wait() и не убивает поток."""
+        with mock.patch.object(
+            thumbnails, 'close_old_connections',
+            side_effect=RuntimeError('Database access not allowed'),
+        ):
+            thumbnails.enqueue('posts/missing-1.gif')
+            thumbnails.wait()
+            thumbnails.enqueue('posts/missing-2.gif')
+            thumbnails.wait()
+        self.assertTrue(thumbnails._worker.is_alive())
@@ -1,15 +1,21 @@
+import hashlib
 import shutil
 import tempfile
+from io import StringIO
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from ..models import Follow, Group, Post
+from .. import feeds
+from ..models import AuthorStats, Comment, Follow, Group, Post, Timeline
 
 User = get_user_model()
 
@@ -25,6 +31,9 @@ small_gif = (
     b'\x02\x00\x01\x00\x00\x02\x02\x0C'
     b'\x0A\x00\x3B'
 )
+# Картинки хранятся под SHA-256 содержимого (posts.storage).
+SMALL_GIF_HASH = hashlib.sha256(small_gif).hexdigest()
+SMALL_GIF_NAME = f'posts/{SMALL_GIF_HASH[:2]}/{SMALL_GIF_HASH}.gif'
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -108,7 +117,7 @@ class PostViewsTests(TestCase):
         self.assertEqual(str(first_object),
                          'Тестовый пост')
         self.assertEqual(post_author_0, 'username')
-        self.assertEqual(image_object, 'posts/small.gif')
+        self.assertEqual(image_object, SMALL_GIF_NAME)
 
     def test_group_list_page_show_correct_context(self):
         """Шаблон group_list сгенерирован с верным контекстом."""
@@ -122,7 +131,7 @@ class PostViewsTests(TestCase):
         image_object = post_object.image
         post_group = group_object.title
         self.assertEqual(post_group, 'Тестовая группа')
-        self.assertEqual(image_object, 'posts/small.gif')
+        self.assertEqual(image_object, SMALL_GIF_NAME)
 
     def test_profile_page_show_correct_context(self):
         """Шаблон profile сгенерирован с верным контекстом."""
@@ -134,7 +143,7 @@ class PostViewsTests(TestCase):
         image_object = profile_object.image
         post_author_0 = profile_object.author.username
         self.assertEqual(post_author_0, 'username')
-        self.assertEqual(image_object, 'posts/small.gif')
+        self.assertEqual(image_object, SMALL_GIF_NAME)
 
     def test_post_detail_page_show_correct_context(self):
         """Шаблон post_detail сгенерирован с верным контекстом."""
@@ -145,7 +154,7 @@ class PostViewsTests(TestCase):
         post_detail_object = response.context['post']
         image_object = post_detail_object.image
         self.assertEqual(post_detail_object.pk, 1)
-        self.assertEqual(image_object, 'posts/small.gif')
+        self.assertEqual(image_object, SMALL_GIF_NAME)
 
     def test_post_create_page_show_correct_context(self):
         """Шаблон post_create сгенерирован с верным контекстом."""
@@ -257,19 +266,102 @@ class PaginatorViewsTest(TestCase):
         )
         self.assertEqual(len(response.context['page_obj']), SECOND_PAGE2)
 
-    def test_cache_index_page(self):
+    def test_cursor_pages_cover_all_posts(self):
+        """Переходы по ?after= обходят ленту без пропусков и повторов."""
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+        seen = []
+        url = reverse('posts:index')
+        while url:
+            cache.clear()
+            page_obj = self.anon_client.get(url).context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            url = (
+                reverse('posts:index') + f'?after={page_obj.next_cursor}'
+                if page_obj.has_next() else None
+            )
+        self.assertEqual(seen, expected)
+
+    def test_cursor_page_does_not_count(self):
+        """Курсорная страница не выполняет COUNT(*) по таблице постов."""
+        first = self.anon_client.get(reverse('posts:index'))
+        cursor = first.context['page_obj'].next_cursor
+        with CaptureQueriesContext(connection) as queries:
+            response = self.anon_client.get(
+                reverse('posts:index') + f'?after={cursor}'
+            )
+        self.assertEqual(len(response.context['page_obj']), SECOND_PAGE1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_cursor_previous_page(self):
+        """Ссылка ?before= возвращает на предыдущую страницу."""
+        first = self.anon_client.get(reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug_1'}
+        )).context['page_obj']
+        second = self.anon_client.get(reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug_1'}
+        ) + f'?after={first.next_cursor}').context['page_obj']
+        self.assertEqual(len(second), SECOND_PAGE2)
+        back = self.anon_client.get(reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug_1'}
+        ) + f'?before={second.previous_cursor}').context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_broken_cursor_returns_first_page(self):
+        """Повреждённый курсор открывает первую страницу."""
+        response = self.anon_client.get(
+            reverse('posts:index') + '?after=not-a-cursor'
+        )
+        self.assertEqual(len(response.context['page_obj']), FISRT_PAGE)
+        self.assertFalse(response.context['page_obj'].has_previous())
 
+    def test_cache_index_page(self):
+        """Повторный запрос ленты отдаётся из кэша без запросов к БД."""
         response1 = self.anon_client.get(reverse('posts:index'))
-        Post.objects.create(
+        with self.assertNumQueries(0):
+            response2 = self.anon_client.get(reverse('posts:index'))
+        self.assertEqual(response1.content, response2.content)
+
+    def test_cache_invalidated_by_writes(self):
+        """Новый пост и удаление поста сразу видны на закэшированной ленте."""
+        self.anon_client.get(reverse('posts:index'))
+        new_post = Post.objects.create(
             text='Текст тестировки кэша',
             author=self.user_1,
         )
-        self.post.delete()
-        response2 = self.anon_client.get(reverse('posts:index'))
-        self.assertEqual(response1.content, response2.content)
-        cache.clear()
-        response3 = self.anon_client.get(reverse('posts:index'))
-        self.assertNotEqual(response1.content, response3.content)
+        response = self.anon_client.get(reverse('posts:index'))
+        self.assertContains(response, new_post.text)
+        new_post.delete()
+        response = self.anon_client.get(reverse('posts:index'))
+        self.assertNotContains(response, new_post.text)
+
+    def test_cache_scopes(self):
+        """Комментарий обновляет ленту группы, подписка — профиль."""
+        group_url = reverse(
+            'posts:group_list', kwargs={'slug': 'test-slug_2'}
+        )
+        profile_url = reverse(
+            'posts:profile', kwargs={'username': 'username_1'}
+        )
+        self.anon_client.get(group_url)
+        self.anon_client.get(profile_url)
+        Comment.objects.create(
+            post=self.post,
+            author=self.user_1,
+            text='Комментарий',
+        )
+        self.assertContains(
+            self.anon_client.get(group_url), 'Комментариев: 1'
+        )
+        Follow.objects.create(user=self.user_2, author=self.user_1)
+        self.assertContains(
+            self.anon_client.get(profile_url), 'Подписчиков: 1'
+        )
 
 
 class ViewTestClass(TestCase):
@@ -328,3 +420,107 @@ class FollowTests(TestCase):
             )
         )
         self.assertNotContains(response, self.post.text)
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит в ленту уже опубликованные посты автора."""
+        self.client_auth_follower.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'following'}
+        ))
+        self.assertTrue(Timeline.objects.filter(
+            user=self.user_follower, post=self.post
+        ).exists())
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост автора попадает в ленты его подписчиков."""
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        new_post = Post.objects.create(
+            author=self.user_following,
+            text='Новый пост'
+        )
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.assertFalse(Timeline.objects.filter(
+            user=self.user_following
+        ).exists())
+
+    def test_unfollow_trims_timeline(self):
+        """Отписка убирает посты автора из ленты."""
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        self.client_auth_follower.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'following'}
+        ))
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(len(response.context['page_obj']), 0)
+        self.assertFalse(Timeline.objects.exists())
+
+    @override_settings(POSTS_FANOUT_FOLLOWER_LIMIT=1)
+    def test_hybrid_feed_merges_pulled_authors(self):
+        """Посты популярного автора читаются при запросе и сливаются
+        с материализованной лентой в общем порядке."""
+        popular = User.objects.create_user(username='popular')
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=other, author=popular)
+        Follow.objects.create(user=self.user_follower, author=popular)
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        for i in range(6):
+            Post.objects.create(author=popular, text=f'Популярный {i}')
+            Post.objects.create(author=self.user_following, text=f'Пост {i}')
+        self.assertFalse(Timeline.objects.filter(author=popular).exists())
+        expected = list(Post.objects.filter(
+            author__in=[popular, self.user_following]
+        ).order_by('-pub_date', '-pk'))
+        first = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        ).context['page_obj']
+        second = self.client_auth_follower.get(
+            reverse('posts:follow_index') + f'?after={first.next_cursor}'
+        ).context['page_obj']
+        self.assertEqual(list(first) + list(second), expected)
+        self.assertFalse(second.has_next())
+
+    @override_settings(
+        POSTS_FANOUT_FOLLOWER_LIMIT=2, POSTS_FANOUT_PUSH_LIMIT=1
+    )
+    def test_fanout_hysteresis(self):
+        """Отписки не дополняют ленты в запросе: в push автора
+        возвращает restore_fanout, и только ниже нижнего порога."""
+        author = User.objects.create_user(username='author')
+        readers = [
+            User.objects.create_user(username=f'reader{i}') for i in range(3)
+        ]
+        post = Post.objects.create(author=author, text='Старый пост')
+        follows = [
+            Follow.objects.create(user=reader, author=author)
+            for reader in readers
+        ]
+        self.assertTrue(feeds.is_pulled(author.pk))
+        Timeline.objects.filter(author=author).delete()
+        follows[0].delete()
+        self.assertTrue(feeds.is_pulled(author.pk))
+        call_command('restore_fanout', stdout=StringIO())
+        self.assertTrue(feeds.is_pulled(author.pk))
+        follows[1].delete()
+        self.assertFalse(Timeline.objects.filter(author=author).exists())
+        out = StringIO()
+        call_command('restore_fanout', stdout=out)
+        self.assertIn('Возвращено в push: 1.', out.getvalue())
+        self.assertFalse(AuthorStats.objects.get(user=author).fanout_pulled)
+        self.assertEqual(
+            list(Timeline.objects.filter(author=author).values_list(
+                'user_id', 'post_id'
+            )),
+            [(readers[2].pk, post.pk)],
+        )
@@ -0,0 +1,310 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.engines import pil_engine
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+
+from . import images, page_cache
+from .models import Post
+from .signals import post_scopes
+
+logger = logging.getLogger(__name__)
+
+# Все размеры, которые шаблоны запрашивают через {% thumbnail %}.
+SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_queue = queue.Queue()
+_pending = set()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def worker_enabled():
+    """Генерировать миниатюры в фоновом потоке, а не в запросе."""
+    return getattr(settings, 'POSTS_THUMBNAIL_WORKER', True)
+
+
+def image_storage():
+    # Ключи sorl зависят от хранилища оригинала: берём то же, что
+    # у поля, иначе страницы искали бы миниатюры под другим ключом.
+    return Post._meta.get_field('image').storage
+
+
+def generate(name):
+    """Создаёт все миниатюры SIZES и варианты для srcset файла name.
+
+    Возвращает True, если хоть что-то пришлось создать: тогда
+    страницы с этим изображением сбрасываются из кэша лент.
+    Исход считается в метрике yatube_thumbnails_total.
+    """
+    try:
+        created = _generate(name)
+    except Exception:
+        metrics.inc('yatube_thumbnails_total', (('result', 'error'),))
+        raise
+    metrics.inc(
+        'yatube_thumbnails_total',
+        (('result', 'created' if created else 'skipped'),),
+    )
+    return created
+
+
+def _generate(name):
+    storage = image_storage()
+    if not storage.exists(name):
+        return False
+    backend = ThumbnailBackend()
+    source = ImageFile(name, storage)
+    created = False
+    for geometry, options in SIZES:
+        options = dict(options)
+        thumbnail = ImageFile(
+            thumbnail_name(backend, source, geometry, options),
+            default.storage,
+        )
+        if default.kvstore.get(thumbnail):
+            continue
+        backend.get_thumbnail(source, geometry, **options)
+        created = True
+    if Post.objects.filter(image=name, image_variants='').exists():
+        # Тот же файл мог уже прийти с другим постом: его варианты
+        # лежат рядом и подходят как есть.
+        ready = Post.objects.filter(image=name).exclude(
+            image_variants=''
+        ).values_list('image_variants', flat=True).first()
+        if ready:
+            Post.objects.filter(image=name).update(image_variants=ready)
+        else:
+            images.make_variants(name)
+        created = True
+    if created:
+        for post in Post.objects.filter(image=name):
+            page_cache.bump(*post_scopes(post))
+    return created
+
+
+def forget(name):
+    """Удаляет готовые миниатюры и варианты файла name, чтобы
+    generate() создал их заново."""
+    default.kvstore.delete_thumbnails(ImageFile(name, image_storage()))
+    Post.objects.filter(image=name).update(image_variants='')
+
+
+def thumbnail_name(backend, source, geometry, options):
+    """Имя файла миниатюры, как его построил бы sorl, без генерации."""
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def _work():
+    while True:
+        name = _queue.get()
+        try:
+            generate(name)
+        except Exception:
+            logger.exception('Не удалось создать миниатюры для %s', name)
+        finally:
+            try:
+                with _worker_lock:
+                    _pending.discard(name)
+                close_old_connections()
+                metrics.flush()
+            except Exception:
+                logger.exception('Ошибка уборки после миниатюр %s', name)
+            finally:
+                # Иначе wait() зависнет, а поток умрёт с задачей в работе.
+                _queue.task_done()
+
+
+def enqueue(name):
+    """Ставит файл в очередь фонового потока генерации миниатюр."""
+    global _worker
+    if not worker_enabled():
+        generate(name)
+        return
+    with _worker_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(
+                target=_work, name='thumbnails', daemon=True
+            )
+            _worker.start()
+    _queue.put(name)
+
+
+def schedule(name):
+    """Ставит файл в очередь после коммита: до него поток-генератор
+    не увидел бы ни файла в базе, ни поста."""
+    transaction.on_commit(lambda: enqueue(name))
+
+
+def wait():
+    """Дожидается, пока очередь генерации опустеет."""
+    _queue.join()
+
+
+def _get_many_raw(keys):
+    store = default.kvstore
+    if hasattr(store, 'get_many_raw'):
+        return store.get_many_raw(keys)
+    return {key: store._get_raw(key) for key in keys}
+
+
+def _thumbnail_keys(backend, source):
+    """Пары (ключ KV, имя миниатюры) для всех размеров SIZES."""
+    for geometry, options in SIZES:
+        name = thumbnail_name(backend, source, geometry, dict(options))
+        yield add_prefix(ImageFile(name, default.storage).key), name
+
+
+def missing(names):
+    """Сколько миниатюр SIZES ещё не создано для файлов names."""
+    backend = ThumbnailBackend()
+    storage = image_storage()
+    keys = [
+        key for name in names
+        for key, _ in _thumbnail_keys(backend, ImageFile(name, storage))
+    ]
+    if not keys:
+        return 0
+    found = _get_many_raw(keys)
+    return len(keys) - sum(1 for value in found.values() if value)
+
+
+def prefetch(posts):
+    """Достаёт миниатюры всех размеров для страницы постов разом.
+
+    Вместо отдельного обращения к KV-хранилищу sorl на каждый тег
+    {% thumbnail %} делается один get_many к кэшу и не больше одного
+    запроса к базе за промахи. Результат запоминается на post.image,
+    и PregeneratedThumbnailBackend берёт его оттуда.
+    """
+    backend = ThumbnailBackend()
+    wanted = {}
+    for post in posts:
+        if not post.image:
+            continue
+        source = ImageFile(post.image)
+        post.image.thumbnails = {}
+        for key, name in _thumbnail_keys(backend, source):
+            wanted.setdefault(key, []).append((post.image, name))
+    if not wanted:
+        return
+    values = _get_many_raw(list(wanted))
+    for key, targets in wanted.items():
+        value = values.get(key)
+        thumbnail = deserialize_image_file(value) if value else None
+        for image, name in targets:
+            image.thumbnails[name] = thumbnail
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который не декодирует изображения в запросе.
+
+    Готовая миниатюра берётся из результата prefetch() или из
+    KV-хранилища. Если её ещё нет, файл ставится в очередь,
+    а страница получает оригинал.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source = ImageFile(file_)
+        name = thumbnail_name(self, source, geometry_string, options)
+        prefetched = getattr(file_, 'thumbnails', {})
+        if name in prefetched:
+            cached = prefetched[name]
+        else:
+            cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        schedule(source.name)
+        return source
+
+
+class CachedDBKVStore(cached_db_kvstore.KVStore):
+    """KV-хранилище sorl по умолчанию (кэш поверх базы) с get_many."""
+
+    def get_many_raw(self, keys):
+        values = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if missing:
+            found = dict(
+                KVStoreModel.objects.filter(key__in=missing)
+                .values_list('key', 'value')
+            )
+            # Промахи тоже кэшируются, чтобы не ходить за ними в базу.
+            fetched = {
+                key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+                for key in missing
+            }
+            self.cache.set_many(
+                fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+            )
+            values.update(fetched)
+        return {
+            key: value for key, value in values.items()
+            if value != cached_db_kvstore.EMPTY_VALUE
+        }
+
+
+class CacheKVStore(KVStoreBase):
+    """KV-хранилище sorl только в кэше, без таблицы в базе.
+
+    Подходит, когда кэш общий и переживает перезапуск (core.cache):
+    тёплая страница не делает ни одного запроса к базе. Вытесненную
+    запись восстановит фоновый генератор, файл миниатюры при этом
+    заново не создаётся. Поиск ключей по префиксу не поддерживается,
+    поэтому thumbnail cleanup ничего не делает.
+    """
+
+    cache = cached_db_kvstore.KVStore.cache
+
+    def get_many_raw(self, keys):
+        return self.cache.get_many(keys)
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        return []
+
+
+class Engine(pil_engine.Engine):
+    """Движок PIL для sorl без Image.ANTIALIAS, которого нет в Pillow 10+.
+
+    ANTIALIAS всегда был псевдонимом LANCZOS, миниатюры не меняются.
+    """
+
+    def _scale(self, image, width, height):
+        return image.resize((width, height), resample=Image.LANCZOS)
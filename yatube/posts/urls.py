@@ -14,6 +14,17 @@ urlpatterns = [
         'posts/<int:post_id>/comment/',
         views.add_comment,
         name='add_comment'),
+    path('search/', views.post_search, name='search'),
+    path(
+        'autocomplete/groups/',
+        views.autocomplete_groups,
+        name='autocomplete_groups'
+    ),
+    path(
+        'autocomplete/users/',
+        views.autocomplete_users,
+        name='autocomplete_users'
+    ),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
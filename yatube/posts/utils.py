@@ -1,9 +1,205 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import heapq
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
 
 ORDER = 10
+CURSOR_KEYS = ('pub_date', 'pk')
+
+
+def encode_cursor(values):
+    """Упаковывает значения ключей сортировки в непрозрачную строку."""
+    raw = json.dumps([
+        value.isoformat() if isinstance(value, datetime) else value
+        for value in values
+    ])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """Распаковывает курсор, приводя значения к типам полей модели.
+
+    Возвращает None, если курсор повреждён или не подходит к ключам.
+    """
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [
+            field.to_python(value) for field, value in zip(fields, values)
+        ]
+    except (binascii.Error, UnicodeDecodeError, ValueError,
+            TypeError, ValidationError):
+        return None
+
+
+def keyset_condition(keys, values, lookup):
+    """Строит условие «строго после курсора» для составного ключа.
+
+    Для ключей (a, b) и lookup='lt' это
+    a <= x AND (a < x OR (a = x AND b < y)). Избыточное первое
+    слагаемое позволяет SQLite искать начало страницы по индексу,
+    а не просматривать его с начала.
+    """
+    condition = Q()
+    for index, key in enumerate(keys):
+        equal = dict(zip(keys[:index], values[:index]))
+        equal[f'{key}__{lookup}'] = values[index]
+        condition |= Q(**equal)
+    return Q(**{f'{keys[0]}__{lookup}e': values[0]}) & condition
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по составному ключу (по умолчанию pub_date, pk).
+
+    Не выполняет COUNT(*) и не использует OFFSET: каждая страница —
+    это выборка per_page + 1 строк, начиная с курсора, поэтому её
+    стоимость не зависит от глубины прокрутки.
+    """
+
+    cursor_based = True
+
+    def __init__(self, object_list, per_page, keys=CURSOR_KEYS):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+
+    def make_page(self, rows, next_cursor=None, previous_cursor=None):
+        """Собирает обычный Page с курсорами соседних страниц.
+
+        Номер страницы и num_pages условные: они нужны лишь для того,
+        чтобы has_next()/has_previous() работали без подсчёта строк.
+        """
+        number = 2 if previous_cursor else 1
+        self.num_pages = number + 1 if next_cursor else number
+        page = Page(rows, number, self)
+        page.next_cursor = next_cursor
+        page.previous_cursor = previous_cursor
+        return page
+
+    def key_fields(self):
+        opts = self.object_list.model._meta
+        return [
+            opts.pk if key == 'pk' else opts.get_field(key)
+            for key in self.keys
+        ]
+
+    def cursor_for(self, obj):
+        return encode_cursor(getattr(obj, key) for key in self.keys)
+
+    def fetch(self, values, reverse):
+        """Возвращает до per_page + 1 объектов после курсора.
+
+        reverse=False — страницы дальше в прошлое (по убыванию ключа),
+        reverse=True — более новые записи (по возрастанию ключа).
+        """
+        queryset = self.object_list
+        if reverse:
+            ordering = self.keys
+            lookup = 'gt'
+        else:
+            ordering = [f'-{key}' for key in self.keys]
+            lookup = 'lt'
+        if values is not None:
+            queryset = queryset.filter(
+                keyset_condition(self.keys, values, lookup)
+            )
+        return list(queryset.order_by(*ordering)[:self.per_page + 1])
+
+    def get_cursor_page(self, after=None, before=None):
+        """Возвращает страницу после курсора after или перед before.
+
+        Повреждённый курсор трактуется как его отсутствие,
+        по аналогии с get_page() для некорректного номера страницы.
+        """
+        fields = self.key_fields()
+        if before:
+            values = decode_cursor(before, fields)
+            if values is not None:
+                return self._page_before(values)
+        values = decode_cursor(after, fields) if after else None
+        rows = self.fetch(values, reverse=False)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return self.make_page(
+            rows,
+            next_cursor=self.cursor_for(rows[-1]) if has_more else None,
+            previous_cursor=(
+                self.cursor_for(rows[0])
+                if values is not None and rows else None
+            ),
+        )
+
+    def _page_before(self, values):
+        rows = self.fetch(values, reverse=True)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            return self.get_cursor_page()
+        return self.make_page(
+            rows,
+            next_cursor=self.cursor_for(rows[-1]),
+            previous_cursor=self.cursor_for(rows[0]) if has_more else None,
+        )
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная пагинация поверх нескольких отсортированных потоков.
+
+    Каждый поток — тройка (queryset, keys, getter): из каждого берётся
+    не больше per_page + 1 строк после курсора, а затем потоки сливаются
+    k-путевым слиянием через кучу. getter превращает строку потока
+    в объект страницы; одинаковые объекты из разных потоков
+    схлопываются. Курсор строится по keys самих объектов страницы.
+    """
+
+    def __init__(self, object_list, per_page, streams, keys=CURSOR_KEYS):
+        super().__init__(object_list, per_page, keys)
+        self.streams = streams
+
+    def fetch(self, values, reverse):
+        runs = []
+        for queryset, keys, getter in self.streams:
+            rows = CursorPaginator(queryset, self.per_page, keys).fetch(
+                values, reverse
+            )
+            runs.append([
+                (tuple(getattr(row, key) for key in keys), getter(row))
+                for row in rows
+            ])
+        merged = heapq.merge(
+            *runs, key=lambda item: item[0], reverse=not reverse
+        )
+        result = []
+        seen = set()
+        for _, obj in merged:
+            if obj.pk in seen:
+                continue
+            seen.add(obj.pk)
+            result.append(obj)
+            if len(result) > self.per_page:
+                break
+        return result
+
 
+def paginator(request, post_list, keys=CURSOR_KEYS):
+    """Постраничный вывод ленты.
 
-def paginator(request, post_list):
-    regularity = Paginator(post_list, ORDER)
-    page_number = request.GET.get('page')
-    return regularity.get_page(page_number)
+    По умолчанию работает курсорная пагинация (?after= / ?before=)
+    по ключам keys; старые ссылки вида ?page=N по-прежнему
+    обслуживает Paginator.
+    """
+    if 'page' in request.GET:
+        regularity = Paginator(post_list, ORDER)
+        page_number = request.GET.get('page')
+        return regularity.get_page(page_number)
+    return CursorPaginator(post_list, ORDER, keys).get_cursor_page(
+        after=request.GET.get('after'),
+        before=request.GET.get('before'),
+    )
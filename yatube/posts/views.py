@@ -1,28 +1,36 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-from posts import utils
+from posts import autocomplete, feeds, search, thumbnails, utils
+from posts.page_cache import cache_feed, conditional_page
 
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
+from .models import Follow, Group, Post, User
 
 ORDER = 10
 
 
-@cache_page(20, key_prefix='index_page')
+@conditional_page('index')
+@cache_feed('index')
 def index(request):
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related('author', 'group')
     page_obj = utils.paginator(request, post_list)
+    thumbnails.prefetch(page_obj)
     return render(request, 'posts/index.html', {
         'page_obj': page_obj,
     }
     )
 
 
+@conditional_page('group:{slug}')
+@cache_feed('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
+    post_list = group.posts.select_related('author')
     page_obj = utils.paginator(request, post_list)
+    thumbnails.prefetch(page_obj)
     return render(request, 'posts/group_list.html', {
         'group': group,
         'page_obj': page_obj,
@@ -30,10 +38,16 @@ def group_posts(request, slug):
     )
 
 
+@conditional_page('profile:{username}')
+@cache_feed('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    author_posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username
+    )
+    author_posts = author.posts.select_related('author', 'group')
     page_obj = utils.paginator(request, author_posts)
+    thumbnails.prefetch(page_obj)
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user,
@@ -44,17 +58,54 @@ def profile(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'author_posts': author_posts,
         'following': following,
     }
     return render(request, 'posts/profile.html', context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '')
+    page_obj = search.search_page(request, query)
+    thumbnails.prefetch(page_obj)
+    return render(request, 'posts/search.html', {
+        'page_obj': page_obj,
+        'authors': autocomplete.users.search(query, limit=5),
+        'query': query,
+        'search_params': urlencode({'q': query}) + '&',
+    })
+
+
+def autocomplete_groups(request):
+    return JsonResponse({
+        'results': autocomplete.groups.search(request.GET.get('q', '')),
+    })
+
+
+def autocomplete_users(request):
+    return JsonResponse({
+        'results': autocomplete.users.search(request.GET.get('q', '')),
+    })
+
+
+def post_author_scopes(post_id):
+    # На странице поста есть число постов автора: оно меняется
+    # вместе с областью его профиля.
+    username = Post.objects.filter(pk=post_id).values_list(
+        'author__username', flat=True
+    ).first()
+    return None if username is None else [f'profile:{username}']
+
+
+@conditional_page('post:{post_id}', post_author_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id
+    )
+    thumbnails.prefetch([post])
     title = post.text[:30]
     form = CommentForm()
-    comments = Comment.objects.select_related('post').filter(post=post)
+    comments = post.comments.select_related('author')
     context = {
         'post': post,
         'title': title,
@@ -79,13 +130,15 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    if post.image:
+        thumbnails.schedule(post.image.name)
     return redirect('posts:profile', post.author.username)
 
 
 @login_required
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if post.author_id != request.user.pk:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -93,7 +146,11 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
+        if 'image' in form.changed_data:
+            post.image_variants = ''
         form.save()
+        if post.image and 'image' in form.changed_data:
+            thumbnails.schedule(post.image.name)
         return redirect('posts:post_detail', post_id)
     context = {
         'post': post,
@@ -118,8 +175,8 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    authors_posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = utils.paginator(request, authors_posts)
+    page_obj = feeds.timeline_page(request, request.user)
+    thumbnails.prefetch(page_obj)
     context = {
         'page_obj': page_obj,
     }
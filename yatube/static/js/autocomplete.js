@@ -0,0 +1,38 @@
+// Подсказки для полей с data-autocomplete: по мере ввода запрашивает
+// адрес из атрибута и заполняет <datalist> названиями (title);
+// id выбранной записи пишет в скрытое поле из data-target.
+document.querySelectorAll('[data-autocomplete]').forEach(function (input) {
+  var target = document.getElementById(input.dataset.target);
+  var list = document.getElementById(input.getAttribute('list'));
+  var found = {};
+  var timer = null;
+
+  // Текст, не совпавший ни с одной подсказкой, сбрасывает выбор:
+  // иначе форма ушла бы с группой, выбранной до правки текста.
+  function choose() {
+    var id = found[input.value];
+    target.value = id === undefined ? '' : id;
+  }
+
+  input.addEventListener('input', function () {
+    choose();
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var url = input.dataset.autocomplete + '?q=' +
+        encodeURIComponent(input.value);
+      fetch(url).then(function (response) {
+        return response.json();
+      }).then(function (data) {
+        found = {};
+        list.innerHTML = '';
+        data.results.forEach(function (item) {
+          found[item.title] = item.id;
+          var option = document.createElement('option');
+          option.value = item.title;
+          list.appendChild(option);
+        });
+        choose();
+      });
+    }, 150);
+  });
+});
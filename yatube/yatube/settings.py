@@ -10,7 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -25,6 +29,15 @@ SECRET_KEY = '=ok^pw5-8)&qu3gqvgvkfp$(2u)+q)o3#h9)@uvrdd-li@*nm@'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Прогон тестов: manage.py test или pytest. Тестам нужны свой кэш
+# и синхронная генерация миниатюр (см. ниже).
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    # Общие файлы хоста (кэш, метрики) у прогона свои: cache.clear() в тестах
+    # не стирает кэш разработчика, параллельные прогоны не мешают.
+    TEST_DIR = tempfile.mkdtemp(prefix='yatube-test-')
+    atexit.register(shutil.rmtree, TEST_DIR, ignore_errors=True)
+
 ALLOWED_HOSTS = [
     'localhost',
     '127.0.0.1',
@@ -56,11 +69,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -70,7 +85,7 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.templates.DjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -151,8 +166,76 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры создаёт фоновый поток после загрузки изображения,
+# страницы только читают готовые (см. posts.thumbnails).
+# Загруженные оригиналы уменьшаются до этой стороны и теряют EXIF.
+POSTS_IMAGE_MAX_SIDE = 2048
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_ENGINE = 'posts.thumbnails.Engine'
+# Миниатюры страницы достаются одним get_many (posts.thumbnails.prefetch).
+# С общим постоянным кэшем можно обойтись без таблицы в базе:
+# 'posts.thumbnails.CacheKVStore'.
+THUMBNAIL_KVSTORE = 'posts.thumbnails.CachedDBKVStore'
+# В тестах поток не запускается: он пережил бы тест и писал бы
+# в уже удалённый временный MEDIA_ROOT и сброшенную базу.
+POSTS_THUMBNAIL_WORKER = not TESTING
+
+# Кэш общий для всех процессов хоста: поколения лент и блокировки
+# single_flight должны быть видны каждому воркеру.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(
+            TEST_DIR if TESTING else BASE_DIR, 'cache.sqlite3'
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
+
+# Страницы лент кэшируются надолго: записи постов, комментариев
+# и подписок сразу сдвигают поколение их областей.
+POSTS_FEED_CACHE_TIMEOUT = 60 * 60
+# Пока один запрос пересобирает устаревшую страницу, остальные
+# получают прежнюю версию, если ей не больше стольких секунд.
+POSTS_FEED_CACHE_GRACE = 5 * 60
+
+# Лента подписок: сколько последних постов автора попадает
+# в материализованную ленту читателя при подписке.
+POSTS_TIMELINE_BACKFILL = 200
+# Посты авторов, у которых подписчиков больше этого числа,
+# не раскладываются по лентам, а читаются в момент запроса.
+POSTS_FANOUT_FOLLOWER_LIMIT = 1000
+# Назад к раскладке автор возвращается, только опустившись до этого
+# числа подписчиков (команда restore_fanout): автор у порога не
+# переключается туда и обратно на каждой подписке.
+POSTS_FANOUT_PUSH_LIMIT = 800
+
+# Замеры запросов (core.perf): за сколько минут хранить статистику
+# по представлениям и отдавать ли клиенту заголовок Server-Timing.
+CORE_PERF_WINDOW = 15
+CORE_PERF_SERVER_TIMING = True
+# Запросы к базе дольше стольких мс попадают в журнал медленных
+# (отчёт: manage.py slow_queries); None выключает журнал.
+CORE_SLOW_QUERY_MS = 100
+# Метрики Prometheus (/metrics): каждый процесс не чаще раза
+# в столько секунд досылает свои счётчики в общий файл хоста,
+# эндпоинт отдаёт их сумму. С токеном сборщик присылает заголовок
+# Authorization: Bearer <токен>.
+CORE_METRICS_PATH = os.path.join(
+    TEST_DIR if TESTING else BASE_DIR, 'metrics.sqlite3'
+)
+CORE_METRICS_FLUSH_INTERVAL = 1.0
+CORE_METRICS_TOKEN = None
+# Профили cProfile (core.middleware.ProfilingMiddleware): доля
+# запросов, профилируемых выборочно, каталог и сколько последних
+# профилей в нём хранить. По запросу профиль снимается с заголовком
+# от manage.py profile_token или флагом ?profile у персонала.
+CORE_PROFILE_SAMPLE_RATE = 0.0
+CORE_PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+CORE_PROFILE_KEEP = 200
+# Снимки памяти tracemalloc (/perf/memory/, manage.py soak_test):
+# глубина стека выделений и сколько снимков держит процесс.
+CORE_MEMORY_FRAMES = 1
+CORE_MEMORY_SNAPSHOTS = 5